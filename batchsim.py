@@ -0,0 +1,245 @@
+"""Many independent wells stepped in lockstep over NumPy arrays, for training and evaluating
+   bots without building a Game, Player and Well object graph per board."""
+import numpy
+from model import *
+from headless import ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_SONIC_DROP, ACTION_HOLD, ACTION_NONE
+
+
+# block coordinates of every tetrad class and rotation state, [class][rotation][block] -> (row, column);
+# classes with two rotation states repeat them so the table is rectangular
+NO_ROTATION_STATES = numpy.array([len(tetradClass.ROTATION_STATES) for tetradClass in TETRAD_CLASSES])
+ROTATION_COORDINATES = numpy.array([[tetradClass.ROTATION_STATES[rotation % len(tetradClass.ROTATION_STATES)]
+                                     for rotation in range(4)] for tetradClass in TETRAD_CLASSES])
+
+NO_HOLD = -1
+
+DROP_TICKS = 20     # the timers Well starts with and resets to
+LOCK_TICKS = 10
+
+
+
+def ClearFullRows(boards):
+    """clear the full rows of (boards, WELL_ROWS) row bitmasks the way Well.LockCurrentTetrad
+       does, returns the new boards and the lines each cleared"""
+    # full rows below the padding row are cleared, the rows left keep their order under
+    # the padding row and the cleared ones come back as empty rows at the top
+    cleared = boards == Well.FULL_ROW
+    cleared[:, 0] = False
+    linesCleared = cleared.sum(axis=1)
+    if not linesCleared.any():
+        return boards, linesCleared
+
+    order = numpy.where(cleared, -1, numpy.arange(Well.WELL_ROWS))
+    order[:, 0] = -2
+    order = numpy.argsort(order, axis=1, kind='mergesort')
+    boards = numpy.take_along_axis(numpy.where(cleared, 0, boards), order, axis=1)
+    return boards, linesCleared
+
+
+
+class BatchSimulator:
+    """N wells held as arrays: the stack as (N, WELL_ROWS) packed row bitmasks and the current
+       tetrad as its class, rotation state and row/column offset from its initial coordinates.
+
+       Step takes one action per board, applies it as if it were requested between two ticks
+       and then runs the tick, following the rules of Well and Player: moves and rotations
+       without wall kicks, the drop and lock timers, pressing down on a dropped tetrad to lock
+       it, sonic drops, the hold, line clears under the padding row, the preview queue and
+       spawning. Tetrads are drawn from a seeded numpy RandomState rather than the random
+       module, and a board that blocks out stops until it is reset."""
+
+    def __init__(self, noBoards, seed=None):
+        self.noBoards = noBoards
+        self.random = numpy.random.RandomState(seed)
+
+        self.rows = numpy.zeros((noBoards, Well.WELL_ROWS), dtype=numpy.uint16)
+        self.tetrads = numpy.zeros(noBoards, dtype=numpy.int8)          # index into TETRAD_CLASSES
+        self.rotations = numpy.zeros(noBoards, dtype=numpy.int8)
+        self.rowOffsets = numpy.zeros(noBoards, dtype=numpy.int8)
+        self.columnOffsets = numpy.zeros(noBoards, dtype=numpy.int8)
+        self.states = numpy.zeros(noBoards, dtype=numpy.int8)           # Tetrad.STATE_*
+        self.nextTetrads = numpy.zeros((noBoards, Player.NO_NEXT_TETRADS), dtype=numpy.int8)
+        self.holdTetrads = numpy.zeros(noBoards, dtype=numpy.int8)
+        self.dropTimers = numpy.zeros(noBoards, dtype=numpy.int16)
+        self.lockTimers = numpy.zeros(noBoards, dtype=numpy.int16)
+
+        self.lines = numpy.zeros(noBoards, dtype=numpy.int64)
+        self.piecesLocked = numpy.zeros(noBoards, dtype=numpy.int64)
+        self.ticks = numpy.zeros(noBoards, dtype=numpy.int64)
+        self.gameOver = numpy.zeros(noBoards, dtype=bool)
+        self.linesCleared = numpy.zeros(noBoards, dtype=numpy.int64)   # by the last step
+
+        self.Reset()
+
+
+    def Reset(self, boards=None):
+        """start new games on the boards given as indices or a mask, all of them by default"""
+        if boards is None:
+            boards = numpy.arange(self.noBoards)
+        boards = self.GetIndices(boards)
+
+        self.rows[boards] = 0
+        self.holdTetrads[boards] = NO_HOLD
+        self.dropTimers[boards] = DROP_TICKS
+        self.lockTimers[boards] = LOCK_TICKS
+        self.lines[boards] = 0
+        self.piecesLocked[boards] = 0
+        self.ticks[boards] = 0
+        self.gameOver[boards] = False
+
+        self.nextTetrads[boards] = self.GetRandomTetrads((len(boards), Player.NO_NEXT_TETRADS))
+        self.SpawnNextTetrads(boards)
+
+    def GetIndices(self, boards):
+        boards = numpy.asarray(boards)
+        if boards.dtype == bool:
+            return numpy.flatnonzero(boards)
+        return boards
+
+    def GetRandomTetrads(self, shape):
+        return self.random.randint(0, len(TETRAD_CLASSES), size=shape)
+
+    def GetCoordinates(self, boards, tetrads, rotations, rowOffsets, columnOffsets):
+        """(boards, 4) arrays of the rows and columns a tetrad's blocks would be in"""
+        coordinates = ROTATION_COORDINATES[tetrads, rotations]
+        return (coordinates[:, :, 0] + rowOffsets[:, numpy.newaxis],
+                coordinates[:, :, 1] + columnOffsets[:, numpy.newaxis])
+
+    def CanOccupy(self, boards, tetrads, rotations, rowOffsets, columnOffsets):
+        """Well.CanOccupy for a tetrad position on each of the boards given by index"""
+        rows, columns = self.GetCoordinates(boards, tetrads, rotations, rowOffsets, columnOffsets)
+        inside = (rows >= 0) & (rows < Well.WELL_ROWS) & (columns >= 0) & (columns < Well.WELL_COLUMNS)
+        rows = numpy.clip(rows, 0, Well.WELL_ROWS - 1)
+        columns = numpy.clip(columns, 0, Well.WELL_COLUMNS - 1)
+        filled = (self.rows[boards[:, numpy.newaxis], rows] >> columns) & 1
+        return inside.all(axis=1) & (filled == 0).all(axis=1)
+
+    def GetCurrentCoordinates(self, boards=None):
+        """(boards, 4, 2) array of the current tetrads' block coordinates"""
+        if boards is None:
+            boards = numpy.arange(self.noBoards)
+        boards = self.GetIndices(boards)
+        rows, columns = self.GetCoordinates(boards, self.tetrads[boards], self.rotations[boards],
+                                            self.rowOffsets[boards], self.columnOffsets[boards])
+        return numpy.dstack((rows, columns))
+
+    def GetCells(self):
+        """(N, WELL_ROWS, WELL_COLUMNS) array with True for each filled square of the stack"""
+        return (self.rows[:, :, numpy.newaxis] >> numpy.arange(Well.WELL_COLUMNS)) & 1 != 0
+
+
+    def Step(self, actions):
+        """apply one ACTION_* per board then tick, returns the lines each board cleared"""
+        actions = numpy.asarray(actions)
+        self.linesCleared[:] = 0
+        alive = ~self.gameOver
+        movable = alive & ((self.states == Tetrad.STATE_ACTIVE) | (self.states == Tetrad.STATE_DROPPED))
+
+        for action, rowOffset, columnOffset in ((ACTION_LEFT, 0, -1), (ACTION_RIGHT, 0, 1), (ACTION_DOWN, 1, 0)):
+            self.Move(numpy.flatnonzero(movable & (actions == action)), rowOffset, columnOffset)
+        # pressing down again locks the tetrad
+        self.lockTimers[alive & (actions == ACTION_DOWN) & (self.states == Tetrad.STATE_DROPPED)] = 1
+
+        self.Rotate(numpy.flatnonzero(movable & (actions == ACTION_ROTATE_CW)), 1)
+        self.Rotate(numpy.flatnonzero(movable & (actions == ACTION_ROTATE_CCW)), -1)
+        self.SonicDrop(numpy.flatnonzero(alive & (actions == ACTION_SONIC_DROP) & (self.states == Tetrad.STATE_ACTIVE)))
+        self.Hold(numpy.flatnonzero(alive & (actions == ACTION_HOLD)))
+
+        self.Tick(alive & ~self.gameOver)
+        return self.linesCleared
+
+    def Move(self, boards, rowOffset, columnOffset):
+        rowOffsets = self.rowOffsets[boards] + rowOffset
+        columnOffsets = self.columnOffsets[boards] + columnOffset
+        moved = self.CanOccupy(boards, self.tetrads[boards], self.rotations[boards], rowOffsets, columnOffsets)
+        boards = boards[moved]
+        self.rowOffsets[boards] = rowOffsets[moved]
+        self.columnOffsets[boards] = columnOffsets[moved]
+        self.states[boards] = Tetrad.STATE_ACTIVE
+        self.lockTimers[boards] = LOCK_TICKS
+
+    def Rotate(self, boards, step):
+        tetrads = self.tetrads[boards]
+        rotations = (self.rotations[boards] + step) % NO_ROTATION_STATES[tetrads]
+        rotated = self.CanOccupy(boards, tetrads, rotations, self.rowOffsets[boards], self.columnOffsets[boards])
+        boards = boards[rotated]
+        self.rotations[boards] = rotations[rotated]
+        self.states[boards] = Tetrad.STATE_ACTIVE
+        self.lockTimers[boards] = LOCK_TICKS
+
+    def SonicDrop(self, boards):
+        # drop a row at a time until every board's tetrad has landed
+        while len(boards):
+            rowOffsets = self.rowOffsets[boards] + 1
+            dropped = self.CanOccupy(boards, self.tetrads[boards], self.rotations[boards],
+                                     rowOffsets, self.columnOffsets[boards])
+            boards = boards[dropped]
+            self.rowOffsets[boards] = rowOffsets[dropped]
+
+    def Hold(self, boards):
+        """Player.SwapTetrad: the first hold takes the next tetrad, later ones swap with the hold"""
+        empty = self.holdTetrads[boards] == NO_HOLD
+        swapping = boards[~empty]
+        holding = boards[empty]
+
+        held = self.tetrads[swapping]
+        self.tetrads[swapping] = self.holdTetrads[swapping]
+        self.holdTetrads[swapping] = held
+        self.ResetPosition(swapping)
+
+        self.holdTetrads[holding] = self.tetrads[holding]
+        self.SpawnNextTetrads(holding)
+
+    def Tick(self, alive):
+        """Well.OnTick: an active tetrad falls each DROP_TICKS ticks, one that could not fall
+           locks LOCK_TICKS ticks later unless it is moved first"""
+        self.ticks[alive] += 1
+        dropped = numpy.flatnonzero(alive & (self.states == Tetrad.STATE_DROPPED))
+        active = numpy.flatnonzero(alive & (self.states == Tetrad.STATE_ACTIVE))
+
+        self.dropTimers[active] -= 1
+        falling = active[self.dropTimers[active] == 0]
+        rowOffsets = self.rowOffsets[falling] + 1
+        fell = self.CanOccupy(falling, self.tetrads[falling], self.rotations[falling],
+                              rowOffsets, self.columnOffsets[falling])
+        self.rowOffsets[falling[fell]] = rowOffsets[fell]
+        self.states[falling[~fell]] = Tetrad.STATE_DROPPED
+        self.dropTimers[falling] = DROP_TICKS
+
+        self.lockTimers[dropped] -= 1
+        locking = dropped[self.lockTimers[dropped] == 0]
+        self.Lock(locking)
+        self.lockTimers[locking] = LOCK_TICKS
+
+    def Lock(self, boards):
+        if len(boards) == 0:
+            return
+        rows, columns = self.GetCoordinates(boards, self.tetrads[boards], self.rotations[boards],
+                                            self.rowOffsets[boards], self.columnOffsets[boards])
+        locked = self.rows[boards]
+        numpy.bitwise_or.at(locked, (numpy.repeat(numpy.arange(len(boards)), 4), rows.ravel()),
+                            numpy.left_shift(1, columns.ravel()).astype(numpy.uint16))
+        locked, linesCleared = ClearFullRows(locked)
+        self.rows[boards] = locked
+        self.lines[boards] += linesCleared
+        self.linesCleared[boards] = linesCleared
+        self.piecesLocked[boards] += 1
+
+        self.SpawnNextTetrads(boards)
+
+    def SpawnNextTetrads(self, boards):
+        """Player.AddTetrad: the first preview tetrad enters the well and a new one joins the queue"""
+        self.tetrads[boards] = self.nextTetrads[boards, 0]
+        self.nextTetrads[boards, :-1] = self.nextTetrads[boards, 1:]
+        self.nextTetrads[boards, -1] = self.GetRandomTetrads(len(boards))
+        self.ResetPosition(boards)
+
+    def ResetPosition(self, boards):
+        """put the current tetrad at its initial coordinates, blocking out if they are filled"""
+        self.rotations[boards] = 0
+        self.rowOffsets[boards] = 0
+        self.columnOffsets[boards] = 0
+        self.states[boards] = Tetrad.STATE_ACTIVE
+        blockedOut = ~self.CanOccupy(boards, self.tetrads[boards], self.rotations[boards],
+                                     self.rowOffsets[boards], self.columnOffsets[boards])
+        self.gameOver[boards[blockedOut]] = True
@@ -0,0 +1,276 @@
+"""Times the well's hot paths, event dispatch and the pygame view's frames in fixed well
+   states, writes the results as JSON and compares them with an earlier run's.
+
+   python benchmarks.py --output new.json --baseline old.json"""
+import os, sys, json, time, timeit, random, platform, argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')   # frames are timed without a window
+from model import *
+from events import *
+from headless import HeadlessEngine
+
+
+STATES = (('empty', 0), ('mid', 8), ('high', 14))  # name, rows of garbage in the well
+CLEAR_COLUMN = Well.WELL_COLUMNS - 1    # the hole in rows a vertical I tetrad clears
+NO_DEALT_TETRADS = 64                   # more than a benchmark deals between restores
+NO_LISTENERS = (1, 10, 50)
+
+timer = timeit.default_timer
+
+
+
+def BuildEngine():
+    """an engine dealing only I tetrads"""
+    return HeadlessEngine(randomizer=SequenceRandomizer([TETRAD_CLASSES.index(ITetrad)] * NO_DEALT_TETRADS))
+
+
+def StackGarbage(engine, noGarbageRows, noClearRows=0):
+    """fill a started engine's well with noGarbageRows rows of garbage holed left of
+       CLEAR_COLUMN under noClearRows rows with their hole in it"""
+    # garbage comes in at the bottom, pushing earlier rows up
+    if noClearRows:
+        engine.well.InsertGarbageRows(noClearRows, CLEAR_COLUMN)
+    rng = random.Random(noGarbageRows)
+    for i in range(noGarbageRows):
+        engine.well.InsertGarbageRows(1, rng.randrange(CLEAR_COLUMN))
+    engine.eventManager.ConsumeEventQueue()
+    if engine.IsGameOver():
+        raise RuntimeError("%d rows of garbage topped out the well" % (noGarbageRows + noClearRows))
+
+
+def DropIntoClearColumn(engine):
+    """stand the current I tetrad up against the right wall and sonic drop it"""
+    engine.Rotate(DIRECTION_CW)
+    for i in range(Well.WELL_COLUMNS):
+        engine.Move(DIRECTION_RIGHT)
+    engine.SonicDrop()
+
+
+def Time(call, noCalls, setup=None):
+    """seconds per call, setup is run untimed before every call if given"""
+    if setup == None:
+        startTime = timer()
+        for i in xrange(noCalls):
+            call()
+        return (timer() - startTime) / noCalls
+
+    seconds = 0.0
+    for i in xrange(noCalls):
+        setup()
+        startTime = timer()
+        call()
+        seconds += timer() - startTime
+    return seconds / noCalls
+
+
+
+def GetWellBenchmarks():
+    """(name, call, setup, calls per round) of the well's operations in every state"""
+    benchmarks = list()
+    for stateName, noRows in STATES:
+        engine = BuildEngine()
+        engine.Start()
+        StackGarbage(engine, noRows)
+        well = engine.well
+        eventManager = engine.eventManager
+        snapshot = engine.Snapshot()
+
+        def Reset(engine=engine, snapshot=snapshot):
+            engine.eventManager.ConsumeEventQueue()
+            engine.Restore(snapshot)
+
+        # moves and rotations go there and back, the events they post are handled untimed
+        def Move(well=well, eventManager=eventManager):
+            well.MoveCurrentTetrad(DIRECTION_LEFT)
+            well.MoveCurrentTetrad(DIRECTION_RIGHT)
+            eventManager.eventQueue = []
+
+        def Rotate(well=well, eventManager=eventManager):
+            well.RotateCurrentTetrad(DIRECTION_CW)
+            well.RotateCurrentTetrad(DIRECTION_CCW)
+            eventManager.eventQueue = []
+
+        def UpdateGhost(well=well, eventManager=eventManager):
+            well.UpdateGhostTetrad()
+            eventManager.eventQueue = []
+
+        def Tick(engine=engine):
+            engine.Tick()
+
+        benchmarks.append(('well.move.%s' % stateName, Move, None, 2000))
+        benchmarks.append(('well.rotate.%s' % stateName, Rotate, None, 2000))
+        benchmarks.append(('well.ghost.%s' % stateName, UpdateGhost, None, 2000))
+        benchmarks.append(('well.drop.%s' % stateName, well.DropCurrentTetrad, Reset, 1000))
+        benchmarks.append(('events.tick.%s' % stateName, Tick, Reset, 1000))
+
+        # locks clearing no lines to four, the I tetrad standing in the hole of the top rows
+        for noLines in range(5):
+            engine = BuildEngine()
+            engine.Start()
+            StackGarbage(engine, noRows, noLines)
+            DropIntoClearColumn(engine)
+            snapshot = engine.Snapshot()
+            lines = engine.GetLines()
+
+            def Reset(engine=engine, snapshot=snapshot):
+                engine.eventManager.ConsumeEventQueue()
+                engine.Restore(snapshot)
+
+            engine.well.LockCurrentTetrad()
+            if engine.GetLines() - lines != noLines:
+                raise RuntimeError("%s lock cleared %d lines not %d" % (stateName, engine.GetLines() - lines, noLines))
+            benchmarks.append(('well.lock.%s.%dlines' % (stateName, noLines), engine.well.LockCurrentTetrad, Reset, 500))
+
+    return benchmarks
+
+
+class BenchmarkEvent(Event):
+    def __init__(self):
+        self.name = "Benchmark Event"
+
+class BenchmarkListener:
+    def OnEvent(self, event):
+        pass
+
+
+def GetEventBenchmarks():
+    """(name, call, setup, calls per round) of posting and handling events among listeners"""
+    benchmarks = list()
+    for noListeners in NO_LISTENERS:
+        eventManager = EventManager()
+        listeners = [BenchmarkListener() for i in range(noListeners)]
+        for listener in listeners:
+            eventManager.RegisterListener(listener, {BenchmarkEvent: listener.OnEvent})
+
+        # the listeners are only weakly referenced by the event manager, the default keeps them
+        def Dispatch(eventManager=eventManager, listeners=listeners):
+            eventManager.Post(BenchmarkEvent())
+            eventManager.ConsumeEventQueue()
+
+        benchmarks.append(('events.dispatch.%dlisteners' % noListeners, Dispatch, None, 5000))
+    return benchmarks
+
+
+def GetViewBenchmarks():
+    """(name, call, setup, calls per round) of PygameView frames, drawn by SDL's dummy driver"""
+    import pygame
+    from tetris import PygameView
+
+    # the view loads its images relative to the game's directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    pygame.init()
+
+    benchmarks = list()
+    frameEvent = FrameEvent()
+    for stateName, noRows in STATES:
+        engine = BuildEngine()
+        view = PygameView(engine.eventManager)
+        engine.Start()
+        StackGarbage(engine, noRows)
+        view.OnFrame(frameEvent)
+
+        # there and back again, the view has the tetrad's sprites to redraw
+        def Move(engine=engine):
+            engine.Move(DIRECTION_LEFT)
+            engine.Move(DIRECTION_RIGHT)
+
+        def Frame(view=view):
+            view.OnFrame(frameEvent)
+
+        benchmarks.append(('view.frame.move.%s' % stateName, Frame, Move, 500))
+
+    # a frame of an empty well where nothing has moved since the last, so nothing is redrawn
+    unchangedEngine = BuildEngine()
+    unchangedView = PygameView(unchangedEngine.eventManager)
+    unchangedEngine.Start()
+    unchangedView.OnFrame(frameEvent)
+
+    def UnchangedFrame(view=unchangedView):
+        view.OnFrame(frameEvent)
+
+    benchmarks.append(('view.frame.unchanged', UnchangedFrame, None, 5000))
+    return benchmarks
+
+
+
+def Run(benchmarks, noRounds, pattern=None):
+    """{name: {'count', 'min', 'median', 'mean', 'max'}} in seconds per call over noRounds rounds"""
+    results = dict()
+    for name, call, setup, noCalls in benchmarks:
+        if pattern != None and pattern not in name:
+            continue
+
+        Time(call, max(noCalls / 10, 1), setup)     # warm up caches and pools
+        rounds = sorted([Time(call, noCalls, setup) for i in range(noRounds)])
+        results[name] = {
+            'count': noCalls * noRounds,
+            'min': rounds[0],
+            'median': rounds[len(rounds) / 2],
+            'mean': sum(rounds) / len(rounds),
+            'max': rounds[-1]}
+    return results
+
+
+def Compare(results, baseline, threshold):
+    """print each result against the baseline's, returns the names that got slower than threshold allows"""
+    regressions = list()
+    print '%-36s %12s %12s %8s' % ('benchmark', 'baseline us', 'median us', 'change')
+    for name in sorted(results.keys()):
+        median = results[name]['median']
+        if name not in baseline:
+            print '%-36s %12s %12.2f %8s' % (name, '-', median * 1000000, 'new')
+            continue
+
+        baselineMedian = baseline[name]['median']
+        if baselineMedian <= 0:
+            # too quick for the timer to tell, there is nothing to compare against
+            print '%-36s %12.2f %12.2f %8s' % (name, baselineMedian * 1000000, median * 1000000, '-')
+            continue
+        change = median / baselineMedian - 1
+        flag = ''
+        if change > threshold:
+            flag = ' REGRESSION'
+            regressions.append(name)
+        print '%-36s %12.2f %12.2f %+7.1f%%%s' % (name, baselineMedian * 1000000, median * 1000000, change * 100, flag)
+    return regressions
+
+
+
+def main(arguments):
+    parser = argparse.ArgumentParser(description="Well, event and view benchmarks")
+    parser.add_argument('--output', default='benchmarks.json', help="file the results are written to as JSON")
+    parser.add_argument('--baseline', default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.10, help="slowdown of a median counted as a regression")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--filter', default=None, help="only run benchmarks whose names contain this")
+    parser.add_argument('--no-view', action='store_true', help="skip the pygame view frames")
+    options = parser.parse_args(arguments)
+
+    benchmarks = GetWellBenchmarks() + GetEventBenchmarks()
+    if not options.no_view:
+        benchmarks += GetViewBenchmarks()
+
+    results = Run(benchmarks, options.rounds, options.filter)
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rounds': options.rounds,
+        'results': results}
+    output = open(options.output, 'w')
+    json.dump(report, output, indent=2, sort_keys=True)
+    output.close()
+
+    baseline = dict()
+    if options.baseline != None:
+        baseline = json.load(open(options.baseline))['results']
+    regressions = Compare(results, baseline, options.threshold)
+    if regressions:
+        print '%d regressions over %.0f%%' % (len(regressions), options.threshold * 100)
+        return 1
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
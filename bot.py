@@ -0,0 +1,147 @@
+"""A bot player that scores every placement of its current and hold tetrads in one
+   batched NumPy pass and plays the best one through the usual request events."""
+import numpy
+from model import *
+from events import *
+from headless import ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_SONIC_DROP, ACTION_HOLD
+from placements import GetPlacements, GetWellPlacements
+from batchsim import ClearFullRows
+
+
+FEATURES = ('aggregateHeight', 'holes', 'bumpiness', 'rowTransitions', 'columnTransitions', 'linesCleared')
+
+DEFAULT_WEIGHTS = {
+    'aggregateHeight': -0.51,
+    'holes': -0.36,
+    'bumpiness': -0.18,
+    'rowTransitions': -0.12,
+    'columnTransitions': -0.12,
+    'linesCleared': 0.76}
+
+
+
+def LockBoards(rows, coordinates):
+    """the boards left by locking each placement into the stack, following Well.LockCurrentTetrad
+
+       rows is the well's row bitmasks, coordinates a (placements, 4, 2) array of (row, column);
+       returns a (placements, WELL_ROWS) array of row bitmasks and the lines each cleared"""
+    noPlacements = coordinates.shape[0]
+    boards = numpy.tile(numpy.asarray(rows, dtype=numpy.int32), (noPlacements, 1))
+    placementIndices = numpy.repeat(numpy.arange(noPlacements), 4)
+    numpy.bitwise_or.at(boards, (placementIndices, coordinates[:, :, 0].ravel()),
+                        numpy.left_shift(1, coordinates[:, :, 1].ravel()).astype(numpy.int32))
+    return ClearFullRows(boards)
+
+
+def GetFeatures(boards, linesCleared):
+    """a (boards, len(FEATURES)) array of the board features in FEATURES order"""
+    noBoards = boards.shape[0]
+    filled = (boards[:, :, numpy.newaxis] >> numpy.arange(Well.WELL_COLUMNS)) & 1 != 0
+
+    # a square is covered if it or any square above it in its column is filled
+    covered = numpy.logical_or.accumulate(filled, axis=1)
+    heights = covered.sum(axis=1)
+    holes = (covered & ~filled).sum(axis=(1, 2))
+    bumpiness = numpy.abs(numpy.diff(heights, axis=1)).sum(axis=1)
+
+    # the walls and the floor count as filled squares
+    walled = numpy.ones((noBoards, Well.WELL_ROWS, Well.WELL_COLUMNS + 2), dtype=bool)
+    walled[:, :, 1:-1] = filled
+    rowTransitions = (walled[:, :, 1:] != walled[:, :, :-1]).sum(axis=(1, 2))
+    floored = numpy.ones((noBoards, Well.WELL_ROWS + 1, Well.WELL_COLUMNS), dtype=bool)
+    floored[:, :-1, :] = filled
+    columnTransitions = (floored[:, 1:, :] != floored[:, :-1, :]).sum(axis=(1, 2))
+
+    return numpy.column_stack((heights.sum(axis=1), holes, bumpiness,
+                               rowTransitions, columnTransitions, linesCleared)).astype(numpy.float64)
+
+
+
+class HeuristicPlanner:
+    """Chooses where to put the current tetrad, or the hold tetrad if holding scores better."""
+    def __init__(self, weights=None):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights != None:
+            self.weights.update(weights)
+        self.weightVector = numpy.array([self.weights[feature] for feature in FEATURES])
+
+    def GetScores(self, rows, placements):
+        """weighted feature score of the board each placement leaves, in one batch"""
+        coordinates = numpy.array([placement.GetCoordinates() for placement in placements], dtype=numpy.int32)
+        boards, linesCleared = LockBoards(rows, coordinates)
+        return GetFeatures(boards, linesCleared).dot(self.weightVector)
+
+    def GetActions(self, player):
+        """ACTION_* list that plays the best placement, holding first if that is better"""
+        well = player.well
+        placements = GetWellPlacements(well)
+        noCurrentPlacements = len(placements)
+
+        # holding swaps in the hold tetrad, or the next one if nothing is held yet
+        holdTetrad = player.holdTetrad
+        if holdTetrad == None:
+            holdTetrad = player.nextTetrads[0]
+        if holdTetrad.__class__ != well.GetCurrentTetrad().__class__:
+            placements += GetPlacements(well.rows, holdTetrad.__class__)
+
+        if not placements:
+            return [ACTION_SONIC_DROP]
+
+        best = int(numpy.argmax(self.GetScores(well.rows, placements)))
+        actions = list(placements[best].GetPath()) + [ACTION_SONIC_DROP]
+        if best >= noCurrentPlacements:
+            actions.insert(0, ACTION_HOLD)
+        return actions
+
+
+
+class HeuristicBot:
+    """Plays for a player by posting move, rotate, sonic drop and swap requests
+       as soon as each new tetrad enters the well."""
+    def __init__(self, eventManager, player, weights=None):
+        self.eventManager = eventManager
+        self.eventManager.RegisterListener(self, {
+            TetradAddedEvent: self.OnTetradAdded,
+            TetradSwappedEvent: self.OnTetradAdded})
+
+        self.player = player
+        self.planner = HeuristicPlanner(weights)
+        self.holding = False    # the tetrad swapped in by a hold is already planned for
+
+
+    def Request(self, action):
+        if action == ACTION_LEFT:
+            self.eventManager.Post(TetradMoveRequest(DIRECTION_LEFT))
+        elif action == ACTION_RIGHT:
+            self.eventManager.Post(TetradMoveRequest(DIRECTION_RIGHT))
+        elif action == ACTION_DOWN:
+            self.eventManager.Post(TetradMoveRequest(DIRECTION_DOWN))
+        elif action == ACTION_ROTATE_CW:
+            self.eventManager.Post(TetradRotateRequest(DIRECTION_CW))
+        elif action == ACTION_ROTATE_CCW:
+            self.eventManager.Post(TetradRotateRequest(DIRECTION_CCW))
+        elif action == ACTION_SONIC_DROP:
+            self.eventManager.Post(SonicDropRequest())
+        elif action == ACTION_HOLD:
+            self.eventManager.Post(TetradSwapRequest())
+
+
+    def OnTetradAdded(self, event):
+        if self.holding:
+            self.holding = False
+            return
+
+        actions = self.planner.GetActions(self.player)
+        self.holding = actions[0] == ACTION_HOLD
+        for action in actions:
+            self.Request(action)
+
+
+
+class HeuristicPolicy:
+    """selfplay policy that plays the heuristic planner's choice"""
+    def __init__(self, seed, weights=None):
+        self.planner = HeuristicPlanner(weights)
+
+    def GetActions(self, engine):
+        return self.planner.GetActions(engine.player)
@@ -0,0 +1,137 @@
+"""Per-frame timings of the pygame view, shown in an overlay and logged to a rolling CSV file
+   when PygameView is given a FrameDiagnostics."""
+import os, csv, timeit
+import pygame
+
+
+CSV_COLUMNS = ('frame', 'time', 'ticks', 'modelMs', 'renderMs', 'updateMs', 'dirtyRects', 'dirtyArea',
+               'frontSprites', 'backSprites', 'missed')
+
+OVERLAY_ORIGIN = (4, 4)
+OVERLAY_COLOUR = (255, 255, 255)
+OVERLAY_FONT_SIZE = 14
+
+
+
+class FrameDiagnostics:
+    """Times each frame's model ticks, sprite drawing and display update against the frame
+       budget. The overlay shows the means and maxima since it was last redrawn, every
+       overlayInterval seconds; the log keeps at most maxRows rows in csvPath, moving the
+       full file to csvPath.1 before starting it again."""
+
+    def __init__(self, frameBudget, csvPath=None, maxRows=100000, overlayInterval=0.25):
+        self.timer = timeit.default_timer
+        self.frameBudget = frameBudget      # seconds a frame may take and still make its deadline
+        self.csvPath = csvPath
+        self.maxRows = maxRows
+        self.overlayInterval = overlayInterval
+
+        self.font = None
+        if pygame.font and pygame.font.get_init():
+            self.font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+        self.overlayRect = None     # where the overlay was last drawn
+
+        self.noFrames = 0
+        self.noMissedFrames = 0
+        self.startTime = self.timer()
+        self.ResetInterval()
+
+        self.file = None
+        self.writer = None
+        self.noRows = 0
+        if csvPath != None:
+            self.OpenLog()
+
+
+    def ResetInterval(self):
+        self.intervalStart = self.timer()
+        self.intervalFrames = 0
+        self.intervalMissed = 0
+        self.totals = [0.0] * 5     # model, render and update seconds, dirty rects, dirty area
+        self.maxima = [0.0] * 5
+        self.sprites = (0, 0)
+
+    def OpenLog(self):
+        self.file = open(self.csvPath, 'wb')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_COLUMNS)
+        self.noRows = 0
+
+    def RollLog(self):
+        """move the full log aside, keeping one previous file"""
+        self.file.close()
+        oldPath = self.csvPath + '.1'
+        if os.path.exists(oldPath):
+            os.remove(oldPath)
+        os.rename(self.csvPath, oldPath)
+        self.OpenLog()
+
+    def Close(self):
+        if self.file != None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+
+    def Record(self, noTicks, modelSeconds, renderSeconds, updateSeconds, dirtyRects, noFrontSprites, noBackSprites):
+        """add a frame, missed if its ticks, drawing and update took longer than the frame budget"""
+        dirtyArea = sum([rect.width * rect.height for rect in dirtyRects])
+        missed = modelSeconds + renderSeconds + updateSeconds > self.frameBudget
+        self.noFrames += 1
+        self.intervalFrames += 1
+        if missed:
+            self.noMissedFrames += 1
+            self.intervalMissed += 1
+
+        values = (modelSeconds, renderSeconds, updateSeconds, len(dirtyRects), dirtyArea)
+        for i in range(len(values)):
+            self.totals[i] += values[i]
+            if values[i] > self.maxima[i]:
+                self.maxima[i] = values[i]
+        self.sprites = (noFrontSprites, noBackSprites)
+
+        if self.writer != None:
+            self.writer.writerow((self.noFrames, '%.6f' % (self.timer() - self.startTime), noTicks,
+                                  '%.4f' % (modelSeconds * 1000), '%.4f' % (renderSeconds * 1000),
+                                  '%.4f' % (updateSeconds * 1000), len(dirtyRects), dirtyArea,
+                                  noFrontSprites, noBackSprites, int(missed)))
+            self.noRows += 1
+            if self.noRows >= self.maxRows:
+                self.RollLog()
+
+
+    def GetOverlayLines(self):
+        seconds = max(self.timer() - self.intervalStart, 1e-9)
+        noFrames = max(self.intervalFrames, 1)
+        means = [total / noFrames for total in self.totals]
+        return [
+            '%.1f fps  %d missed  (%d of %d frames)' % (self.intervalFrames / seconds, self.intervalMissed,
+                                                      self.noMissedFrames, self.noFrames),
+            'model  %.2f ms  max %.2f' % (means[0] * 1000, self.maxima[0] * 1000),
+            'render %.2f ms  max %.2f' % (means[1] * 1000, self.maxima[1] * 1000),
+            'update %.2f ms  max %.2f' % (means[2] * 1000, self.maxima[2] * 1000),
+            'dirty  %.1f rects  %d px' % (means[3], means[4]),
+            'sprites front %d  back %d' % self.sprites]
+
+    def DrawOverlay(self, window, background):
+        """redraw the overlay if overlayInterval has passed, returns the rect to update or None"""
+        if self.timer() - self.intervalStart < self.overlayInterval:
+            return None
+        lines = self.GetOverlayLines()
+        self.ResetInterval()
+        if self.font == None:
+            return None
+
+        images = [self.font.render(line, 1, OVERLAY_COLOUR) for line in lines]
+        lineHeight = self.font.get_linesize()
+        rect = pygame.Rect(OVERLAY_ORIGIN, (max([image.get_width() for image in images]), lineHeight * len(images)))
+
+        # clear what the last overlay covered as well, it may have been wider
+        dirtyRect = rect
+        if self.overlayRect != None:
+            dirtyRect = rect.union(self.overlayRect)
+        window.blit(background, dirtyRect, dirtyRect)
+        for i in range(len(images)):
+            window.blit(images[i], (rect.left, rect.top + i * lineHeight))
+        self.overlayRect = rect
+        return dirtyRect
@@ -0,0 +1,94 @@
+"""A reset()/step(action) environment around the headless game for training bots.
+
+   Observations are NumPy views that share memory with the well and with a small tetrad
+   buffer the environment updates in place, so nothing is rebuilt from the well's squares
+   each step. They change as the game goes on; copy them to keep them."""
+import numpy
+from model import *
+from headless import *
+
+
+NO_HOLD = -1
+
+# fields of the tetrad buffer
+CURRENT_TETRAD = 0
+ROTATION_STATE = 1
+ROW_OFFSET = 2
+COLUMN_OFFSET = 3
+NEXT_TETRADS = 4
+HOLD_TETRAD = NEXT_TETRADS + Player.NO_NEXT_TETRADS
+
+
+
+def GetGrid(rows):
+    """unpack (..., WELL_ROWS) row bitmasks into a (..., WELL_ROWS, WELL_COLUMNS) boolean grid"""
+    return (rows[..., numpy.newaxis] >> numpy.arange(Well.WELL_COLUMNS)) & 1 != 0
+
+
+
+class TetrisEnv:
+    """Plays one game through HeadlessEngine.
+
+       The observation is a dict of
+         rows:    (WELL_ROWS,) uint16 row bitmasks, bit n is column n, a view of Well.rows
+         current: the current tetrad's TETRAD_CLASSES index, rotation state and the
+                  row and column offset from its initial coordinates
+         next:    TETRAD_CLASSES indices of Player.nextTetrads
+         hold:    TETRAD_CLASSES index of the hold tetrad, NO_HOLD if there is none
+       the reward is the lines cleared during the step."""
+
+    def __init__(self, ticksPerStep=1, maxTicks=None, randomizerMode='random'):
+        self.ticksPerStep = ticksPerStep
+        self.randomizerMode = randomizerMode
+        self.maxTicks = maxTicks
+        self.engine = None
+        self.tetradBuffer = numpy.zeros(HOLD_TETRAD + 1, dtype=numpy.int8)
+        self.observation = None
+
+
+    def reset(self, seed=None):
+        """start a new game, seeding the tetrad sequence if a seed is given"""
+        self.engine = HeadlessEngine(randomizer=GetRandomizer(self.randomizerMode, seed))
+        self.engine.Start()
+
+        # the well's rows are a fixed buffer rewritten in place, a view onto them stays current
+        self.observation = {
+            'rows': numpy.frombuffer(self.engine.well.rows, dtype=numpy.uint16),
+            'current': self.tetradBuffer[CURRENT_TETRAD:NEXT_TETRADS],
+            'next': self.tetradBuffer[NEXT_TETRADS:HOLD_TETRAD],
+            'hold': self.tetradBuffer[HOLD_TETRAD:]}
+        self.UpdateTetradBuffer()
+        return self.observation
+
+    def step(self, action):
+        """perform an ACTION_* then run ticksPerStep ticks: returns (observation, reward, done, info)"""
+        engine = self.engine
+        lines = engine.GetLines()
+        if action != ACTION_NONE:
+            engine.Perform(action)
+        engine.Tick(self.ticksPerStep)
+        self.UpdateTetradBuffer()
+
+        done = engine.IsGameOver() or (self.maxTicks != None and engine.ticks >= self.maxTicks)
+        info = {'ticks': engine.ticks, 'piecesLocked': engine.piecesLocked, 'lines': engine.GetLines()}
+        return self.observation, engine.GetLines() - lines, done, info
+
+    def UpdateTetradBuffer(self):
+        player = self.engine.player
+        tetrad = self.engine.well.GetCurrentTetrad()
+        buffer = self.tetradBuffer
+
+        buffer[CURRENT_TETRAD] = TETRAD_CLASSES.index(tetrad.__class__)
+        rotationState = tetrad.GetRotationState()
+        row, column = tetrad.GetBlockCoordinates(0)
+        initialRow, initialColumn = tetrad.ROTATION_STATES[rotationState][0]
+        buffer[ROTATION_STATE] = rotationState
+        buffer[ROW_OFFSET] = row - initialRow
+        buffer[COLUMN_OFFSET] = column - initialColumn
+
+        for i in range(Player.NO_NEXT_TETRADS):
+            buffer[NEXT_TETRADS + i] = TETRAD_CLASSES.index(player.nextTetrads[i].__class__)
+        if player.holdTetrad == None:
+            buffer[HOLD_TETRAD] = NO_HOLD
+        else:
+            buffer[HOLD_TETRAD] = TETRAD_CLASSES.index(player.holdTetrad.__class__)
@@ -4,8 +4,21 @@ class Event:
         self.name = "Generic Event"
 
 class TickEvent(Event):
-    def __init__(self):
+    def __init__(self, time=None):
         self.name = "CPU Tick Event"
+        self.time = time    # time.time() the tick stands for, None if ticks aren't run in real time
+
+class FrameEvent(Event):
+    def __init__(self, interpolation=0.0, noTicks=0, modelTime=0.0):
+        self.name = "Frame Event"
+        self.interpolation = interpolation  # fraction of a tick since the last TickEvent
+        self.noTicks = noTicks              # ticks run since the last frame
+        self.modelTime = modelTime          # seconds they took
+
+class WakeEvent(Event):
+    def __init__(self, inputEvent):
+        self.name = "Wake Event"
+        self.inputEvent = inputEvent    # the pygame event the idle loop woke for
 
 class QuitEvent(Event):
     def __init__(self):
@@ -19,6 +32,16 @@ class GamePauseRequest(Event):
     def __init__(self):
         self.name = "Game Pause Request"
 
+class GamePausedEvent(Event):
+    def __init__(self, game):
+        self.name = "Game Paused Event"
+        self.game = game
+
+class GameResumedEvent(Event):
+    def __init__(self, game):
+        self.name = "Game Resumed Event"
+        self.game = game
+
 class GameStartedEvent(Event):
     def __init__(self, game):
         self.name = "Game Started Event"
@@ -34,6 +57,18 @@ class WellBuiltEvent(Event):
         self.name = "Well Finished Building Event"
         self.well = well
 
+class DirectionPressedEvent(Event):
+    def __init__(self, direction, time):
+        self.name = "Direction Pressed Event"
+        self.direction = direction
+        self.time = time    # time.time() the key went down
+
+class DirectionReleasedEvent(Event):
+    def __init__(self, direction, time):
+        self.name = "Direction Released Event"
+        self.direction = direction
+        self.time = time
+
 class TetradMoveRequest(Event):
     def __init__(self, direction):
         self.name = "Tetrad Move Request"
@@ -112,3 +147,13 @@ class TetradSwappedEvent(Event):
         self.currentTetrad = currentTetrad
         self.holdTetrad = holdTetrad
 
+
+class TetradClearedEvent(Event):
+    def __init__(self, tetrad):
+        self.name = "Tetrad Cleared Event"
+        self.tetrad = tetrad
+
+class GarbageInsertedEvent(Event):
+    def __init__(self, blocks):
+        self.name = "Garbage Inserted Event"
+        self.blocks = blocks
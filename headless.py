@@ -0,0 +1,120 @@
+"""Runs the game model without pygame, stepping ticks as fast as the CPU allows."""
+from model import *
+from events import *
+
+
+ACTION_LEFT = 0
+ACTION_RIGHT = 1
+ACTION_DOWN = 2
+ACTION_ROTATE_CW = 3
+ACTION_ROTATE_CCW = 4
+ACTION_SONIC_DROP = 5
+ACTION_HOLD = 6
+ACTION_NONE = 7     # just let the ticks pass
+NO_ACTIONS = 8
+
+
+
+class HeadlessEngine:
+    """Builds a Game, its Player and Well without a display and drives them
+       through plain method calls instead of pygame input and clock ticks."""
+
+    MAX_TICKS_PER_LOCK = 1000   # a dropped tetrad always locks long before this
+
+    def __init__(self, verbose=False, randomizer=None):
+        self.eventManager = EventManager(verbose)
+        self.eventManager.RegisterListener(self, {
+            TetradLockedEvent: self.OnTetradLocked,
+            TetradAddedEvent: self.OnTetradAdded,
+            TetradSwappedEvent: self.OnTetradAdded,
+            GarbageInsertedEvent: self.OnTetradAdded})
+
+        self.game = Game(self.eventManager, randomizer)
+        self.player = self.game.players[0]
+        self.well = self.player.well
+
+        self.ticks = 0
+        self.piecesLocked = 0
+        self.gameOver = False
+
+
+    def Start(self):
+        self.Request(GameStartRequest())
+
+    def Request(self, event):
+        """post an event and handle it straight away rather than waiting for the next tick"""
+        self.eventManager.Post(event)
+        self.eventManager.ConsumeEventQueue()
+
+    def Tick(self, noTicks=1):
+        for i in range(noTicks):
+            if self.gameOver:
+                break
+            self.eventManager.Post(TickEvent())
+            self.ticks += 1
+
+    def Move(self, direction):
+        self.Request(TetradMoveRequest(direction))
+
+    def Rotate(self, direction):
+        self.Request(TetradRotateRequest(direction))
+
+    def SonicDrop(self):
+        self.Request(SonicDropRequest())
+
+    def Hold(self):
+        self.Request(TetradSwapRequest())
+
+    def Perform(self, action):
+        if action == ACTION_LEFT:
+            self.Move(DIRECTION_LEFT)
+        elif action == ACTION_RIGHT:
+            self.Move(DIRECTION_RIGHT)
+        elif action == ACTION_DOWN:
+            self.Move(DIRECTION_DOWN)
+        elif action == ACTION_ROTATE_CW:
+            self.Rotate(DIRECTION_CW)
+        elif action == ACTION_ROTATE_CCW:
+            self.Rotate(DIRECTION_CCW)
+        elif action == ACTION_SONIC_DROP:
+            self.SonicDrop()
+        elif action == ACTION_HOLD:
+            self.Hold()
+
+    def RunUntilLocked(self):
+        """tick until the current tetrad locks into the stack, returns the ticks it took"""
+        piecesLocked = self.piecesLocked
+        ticks = self.ticks
+        while self.piecesLocked == piecesLocked and not self.gameOver:
+            self.Tick()
+            if self.ticks - ticks > HeadlessEngine.MAX_TICKS_PER_LOCK:
+                raise RuntimeError("tetrad did not lock after %d ticks" % HeadlessEngine.MAX_TICKS_PER_LOCK)
+        return self.ticks - ticks
+
+    def IsGameOver(self):
+        return self.gameOver
+
+    def GetLines(self):
+        return self.well.lines
+
+    def Snapshot(self):
+        """the game state and the engine's counters as an immutable value"""
+        return (self.player.Snapshot(), self.ticks, self.piecesLocked, self.gameOver)
+
+    def Restore(self, (playerSnapshot, ticks, piecesLocked, gameOver)):
+        self.player.Restore(playerSnapshot)
+        self.ticks = ticks
+        self.piecesLocked = piecesLocked
+        self.gameOver = gameOver
+
+    def GetPoolStats(self):
+        return self.player.tetradPool.GetStats()
+
+
+    def OnTetradLocked(self, event):
+        self.piecesLocked += 1
+
+    def OnTetradAdded(self, event):
+        # a new tetrad or garbage pushed up into the current one overlapping the stack tops out
+        if self.well.IsBlockedOut():
+            self.gameOver = True
@@ -0,0 +1,1330 @@
+import random, inspect, weakref, array, collections, time
+from events import *
+from utilities import Callable
+
+VERBOSE = True  # whether new event managers print model diagnostics
+
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+CYAN = (0, 255, 255)
+MAGENTA = (255, 0, 255)
+ORANGE = (255, 153, 51)
+GREY = (100, 100, 100)
+
+
+DIRECTION_UP = 0
+DIRECTION_DOWN = 1
+DIRECTION_LEFT = 2
+DIRECTION_RIGHT = 3
+DIRECTION_CW = 4
+DIRECTION_CCW = 5
+
+DAS = 0.167             # seconds a left or right is held before it auto shifts
+ARR = 0.033             # seconds between auto shifts, 0 shifts straight to the wall
+SOFT_DROP_ARR = 0.033   # seconds between soft drops while down is held
+
+
+class EventManager:
+    """class that coordinates communication between the model and the view and controller"""
+    def __init__(self, verbose=None):
+        self.subscriptions = []     # (weak listener reference, event class, handler function), in registration order
+        self.dispatchTable = dict() # event class -> [(weak listener reference, handler function)]
+        self.eventQueue = []
+        self.profiler = None
+        self.verbose = verbose      # print the diagnostics of the models using this manager
+        if verbose == None:
+            self.verbose = VERBOSE
+
+    def Log(self, message):
+        if self.verbose:
+            print message
+
+    def RegisterListener(self, listener, handlers=None):
+        """subscribe a listener to events, handlers maps event classes to the listener's methods for them;
+           without handlers the listener's Notify is called for every event"""
+        if handlers == None:
+            handlers = {Event: listener.Notify}
+
+        listenerRef = weakref.ref(listener, self.RemoveListenerRef)
+        for eventClass, handler in handlers.items():
+            self.subscriptions.append((listenerRef, eventClass, handler.im_func))
+        self.dispatchTable = dict()
+
+    def UnregisterListener(self, listener):
+        self.subscriptions = [s for s in self.subscriptions if s[0]() is not listener]
+        self.dispatchTable = dict()
+
+    def RemoveListenerRef(self, listenerRef):
+        """called back when a listener is garbage collected"""
+        self.subscriptions = [s for s in self.subscriptions if s[0] is not listenerRef]
+        self.dispatchTable = dict()
+
+    def GetHandlers(self, eventClass):
+        """handlers subscribed to an event class or any of its base classes, cached per class"""
+        handlers = self.dispatchTable.get(eventClass)
+        if handlers == None:
+            baseClasses = inspect.getmro(eventClass)
+            handlers = [(listenerRef, handler) for listenerRef, subscribedClass, handler in self.subscriptions
+                        if subscribedClass in baseClasses]
+            self.dispatchTable[eventClass] = handlers
+        return handlers
+
+    def Post(self, event):
+        """post a new event, broadcast to all listeners"""
+        self.eventQueue.append(event)
+        if isinstance(event, TickEvent) or isinstance(event, FrameEvent) or isinstance(event, WakeEvent):
+            self.ConsumeEventQueue()
+        
+    def ConsumeEventQueue(self):
+        i = 0;
+        while i < len(self.eventQueue):
+            event = self.eventQueue[i]
+            for listenerRef, handler in self.GetHandlers(event.__class__):
+                listener = listenerRef()
+                if listener != None:
+                    handler(listener, event)
+            i += 1
+
+        # all events handled, clear queue
+        self.eventQueue = []
+
+    def SetProfiler(self, profiler):
+        """time the queue with a profiler.EventProfiler, or stop timing it if profiler is None;
+           the untimed queue runs exactly as it does without a profiler"""
+        self.profiler = profiler
+        if profiler == None:
+            if 'ConsumeEventQueue' in self.__dict__:
+                del self.ConsumeEventQueue
+        else:
+            self.ConsumeEventQueue = self.ConsumeEventQueueProfiled
+
+    def ConsumeEventQueueProfiled(self):
+        profiler = self.profiler
+        timer = profiler.timer
+        ticked = False
+        queueStart = timer()
+
+        i = 0
+        while i < len(self.eventQueue):
+            event = self.eventQueue[i]
+            eventStart = timer()
+            for listenerRef, handler in self.GetHandlers(event.__class__):
+                listener = listenerRef()
+                if listener != None:
+                    handlerStart = timer()
+                    handler(listener, event)
+                    profiler.RecordHandler(listener, handler, timer() - handlerStart)
+            profiler.RecordEvent(event.__class__, timer() - eventStart)
+            if isinstance(event, TickEvent):
+                ticked = True
+            i += 1
+
+        self.eventQueue = []
+        profiler.RecordQueue(i, ticked, timer() - queueStart)
+
+
+class Game:
+    """..."""
+
+    STATE_PREPARING = 0
+    STATE_RUNNING = 1
+    STATE_PAUSED = 2
+
+    def __init__(self, eventManager, randomizer=None):
+        self.eventManager = eventManager
+        self.eventManager.RegisterListener(self, {
+            GameStartRequest: self.OnGameStartRequest,
+            GamePauseRequest: self.OnGamePauseRequest})
+
+        self.state = Game.STATE_PREPARING
+
+        #create the players (one player for now)
+        self.players = [Player(eventManager, randomizer)]
+
+    def Start(self):
+        for player in self.players:
+            player.Start()
+
+        self.state = Game.STATE_RUNNING
+
+        self.eventManager.Log("game started")
+        self.eventManager.Post(GameStartedEvent(self))
+
+    def OnGameStartRequest(self, event):
+        if self.state == Game.STATE_PREPARING:
+            self.Start()
+
+    def OnGamePauseRequest(self, event):
+        if self.state == Game.STATE_RUNNING:
+            self.state = Game.STATE_PAUSED
+            self.eventManager.Log("game paused")
+            self.eventManager.Post(GamePausedEvent(self))
+        elif self.state == Game.STATE_PAUSED:
+            self.state = Game.STATE_RUNNING
+            self.eventManager.Log("game resumed")
+            self.eventManager.Post(GameResumedEvent(self))
+
+
+
+class AutoShifter:
+    """Turns held directions into tetrad move requests: one move as the key goes down, then
+       after the delayed auto shift (das) one move every auto repeat (arr) seconds, as many in
+       a tick as have come due by the tick's time. Left and right repeat whichever was pressed
+       last, down repeats every softDropArr seconds."""
+    def __init__(self, eventManager, das=DAS, arr=ARR, softDropArr=SOFT_DROP_ARR):
+        self.eventManager = eventManager
+        self.eventManager.RegisterListener(self, {
+            TickEvent: self.OnTick,
+            DirectionPressedEvent: self.OnDirectionPressed,
+            DirectionReleasedEvent: self.OnDirectionReleased,
+            GamePausedEvent: self.OnGamePaused})
+
+        self.das = das
+        self.arr = arr
+        self.softDropArr = softDropArr
+        self.held = []              # directions held down, in the order they were pressed
+        self.nextShifts = dict()    # held direction -> time its next auto shift is due
+
+    def GetRepeating(self):
+        """the held directions that auto shift, down and the last of left and right"""
+        repeating = [direction for direction in self.held if direction == DIRECTION_DOWN]
+        horizontal = [direction for direction in self.held if direction != DIRECTION_DOWN]
+        if horizontal:
+            repeating.append(horizontal[-1])
+        return repeating
+
+    def Shift(self, direction, noShifts):
+        for i in range(noShifts):
+            self.eventManager.Post(TetradMoveRequest(direction))
+
+    def OnDirectionPressed(self, event):
+        if event.direction in self.held:
+            return
+
+        self.held.append(event.direction)
+        self.Shift(event.direction, 1)
+        if event.direction == DIRECTION_DOWN:
+            self.nextShifts[event.direction] = event.time + self.softDropArr
+        else:
+            self.nextShifts[event.direction] = event.time + self.das
+
+    def OnDirectionReleased(self, event):
+        if event.direction not in self.held:
+            return
+
+        self.held.remove(event.direction)
+        del self.nextShifts[event.direction]
+
+        # the other of left and right still held charges again from here
+        for direction in self.held:
+            if direction != DIRECTION_DOWN:
+                self.nextShifts[direction] = event.time + self.das
+
+    def OnTick(self, event):
+        now = event.time
+        if now == None:
+            now = time.time()
+
+        for direction in self.GetRepeating():
+            due = self.nextShifts[direction]
+            if due > now:
+                continue
+
+            arr = self.arr
+            maxShifts = Well.WELL_COLUMNS - 1
+            if direction == DIRECTION_DOWN:
+                arr = self.softDropArr
+                maxShifts = Well.WELL_ROWS - 1
+
+            # no repeat rate, slide as far as the tetrad goes every tick
+            if arr <= 0:
+                self.Shift(direction, maxShifts)
+                continue
+
+            noShifts = int((now - due) / arr) + 1
+            self.nextShifts[direction] = due + noShifts * arr
+            self.Shift(direction, min(noShifts, maxShifts))
+
+    def OnGamePaused(self, event):
+        # keys held through a pause have to be pressed again
+        self.held = []
+        self.nextShifts = dict()
+
+
+
+class Player:
+
+    
+    NO_NEXT_TETRADS = 3
+    
+    """Model of the player that has a current and next tetrad"""
+    def __init__(self, eventManager, randomizer=None):
+        self.eventManager = eventManager
+        self.eventManager.RegisterListener(self, {
+            GameStartedEvent: self.OnGameStarted,
+            TetradLockedEvent: self.OnTetradLocked,
+            TetradClearedEvent: self.OnTetradCleared,
+            TetradSwapRequest: self.OnTetradSwapRequest})
+
+        #player needs a well to put the tetrads on
+        self.well = Well(eventManager)
+
+        #player's tetrads
+        self.nextTetrads = range(Player.NO_NEXT_TETRADS)   
+        self.holdTetrad = None
+        self.tetradPool = TetradPool(eventManager)
+        self.randomizer = randomizer
+        if self.randomizer == None:
+            self.randomizer = PureRandomizer()
+
+
+    def Start(self):        
+        #create starting tetrads
+        for i in range(Player.NO_NEXT_TETRADS):
+            self.nextTetrads[i] = Tetrad.GetRandomTetrad(self.eventManager, self.tetradPool, self.randomizer)
+        self.eventManager.Post(TetradsCreatedEvent(self.nextTetrads))
+
+        #build well
+        self.well.Build()
+
+
+    def AddTetrad(self):
+        currentTetrad = self.nextTetrads.pop(0)
+        self.well.AddTetrad(currentTetrad)
+        self.nextTetrads.append(Tetrad.GetRandomTetrad(self.eventManager, self.tetradPool, self.randomizer))
+
+        self.eventManager.Post(TetradAddedEvent(currentTetrad, self.nextTetrads))
+
+
+    def SwapTetrad(self):
+        if self.holdTetrad == None:
+             self.holdTetrad = self.well.GetCurrentTetrad()
+             self.holdTetrad.ClearBlocksSquares()
+             self.holdTetrad.ResetRotationState()
+             self.holdTetrad.SetState(Tetrad.STATE_INACTIVE)
+             self.AddTetrad()
+             self.eventManager.Post(TetradHeldEvent(self.holdTetrad))
+
+        else:
+            currentTetrad = self.holdTetrad
+            self.holdTetrad = self.well.GetCurrentTetrad()
+            self.holdTetrad.ClearBlocksSquares()
+            self.holdTetrad.ResetRotationState()
+            self.holdTetrad.SetState(Tetrad.STATE_INACTIVE)
+            self.well.AddTetrad(currentTetrad)
+            self.eventManager.Post(TetradSwappedEvent(currentTetrad, self.holdTetrad))
+
+
+    def Snapshot(self):
+        """the player's and their well's state as an immutable PlayerSnapshot"""
+        holdTetrad = None
+        if self.holdTetrad != None:
+            holdTetrad = self.holdTetrad.__class__
+        return PlayerSnapshot(self.well.Snapshot(), tuple([tetrad.__class__ for tetrad in self.nextTetrads]),
+                              holdTetrad, self.randomizer.GetState())
+
+    def Restore(self, snapshot):
+        """put the player and their well back in a snapshot's state, reusing the tetrads the
+           player holds now where their classes match and the tetrad pool for the rest"""
+        spareTetrads = dict()   # tetrad class -> tetrads the player can reuse
+        for tetrad in [self.well.GetCurrentTetrad(), self.holdTetrad] + self.nextTetrads:
+            if isinstance(tetrad, Tetrad):
+                spareTetrads.setdefault(tetrad.__class__, []).append(tetrad)
+
+        def TakeTetrad(tetradClass):
+            tetrads = spareTetrads.get(tetradClass)
+            if tetrads:
+                tetrad = tetrads.pop()
+                tetrad.Reset()
+                return tetrad
+            return self.tetradPool.Acquire(tetradClass)
+
+        currentTetrad = None
+        if snapshot.well.currentTetrad != None:
+            currentTetrad = TakeTetrad(snapshot.well.currentTetrad[0])
+        self.nextTetrads = [TakeTetrad(tetradClass) for tetradClass in snapshot.nextTetrads]
+        self.holdTetrad = None
+        if snapshot.holdTetrad != None:
+            self.holdTetrad = TakeTetrad(snapshot.holdTetrad)
+
+        for tetrads in spareTetrads.itervalues():
+            for tetrad in tetrads:
+                self.tetradPool.Release(tetrad)
+
+        self.well.Restore(snapshot.well, currentTetrad)
+        self.randomizer.SetState(snapshot.randomizer)
+
+
+    def OnGameStarted(self, event):
+        self.AddTetrad()
+
+    def OnTetradLocked(self, event):
+        self.AddTetrad()
+
+    def OnTetradCleared(self, event):
+        self.tetradPool.Release(event.tetrad)
+
+    def OnTetradSwapRequest(self, event):
+        if self.well.GetCurrentTetrad().GetState() != Tetrad.STATE_LOCKED:
+            self.SwapTetrad()
+ 
+
+        
+
+# immutable copies of a well's and a player's state, see Well.Snapshot and Player.Snapshot;
+# tetrads are recorded as their class and a well's current tetrad as
+# (class, block coordinates, rotation state, state)
+WellSnapshot = collections.namedtuple('WellSnapshot',
+    'rows columns columnHeights currentTetrad dropTimer lockTimer lines gravity')
+PlayerSnapshot = collections.namedtuple('PlayerSnapshot', 'well nextTetrads holdTetrad randomizer')
+
+
+
+class Well:
+    """Model for the well in which tetrads fall into place."""
+
+    WELL_ROWS = 22     # two rows at top are padding for rotations
+    WELL_COLUMNS = 10
+
+    STATE_PREPARING = 0
+    STATE_BUILT = 1
+    
+    LEVELS_FOR_LINES = (1, 2, 4, 6)
+
+    FULL_ROW = (1 << WELL_COLUMNS) - 1  # row bitmask with every column filled
+    MASK_COLUMNS = tuple([tuple([column for column in range(WELL_COLUMNS) if mask & (1 << column)])
+                          for mask in range(FULL_ROW + 1)])    # row bitmask -> filled columns
+
+    def __init__(self, eventManager):
+        self.eventManager = eventManager
+        self.eventManager.RegisterListener(self, {
+            TetradMoveRequest: self.OnTetradMoveRequest,
+            SonicDropRequest: self.OnSonicDropRequest,
+            TetradRotateRequest: self.OnTetradRotateRequest,
+            TickEvent: self.OnTick})
+
+        self.state = Well.STATE_PREPARING
+        # one bitmask per row, bit n is column n; kept in a fixed size buffer that is only ever
+        # rewritten in place so views onto it (see env.py) stay valid
+        self.rows = array.array('H', [0] * Well.WELL_ROWS)
+        self.columns = [0] * Well.WELL_COLUMNS  # one bitmask per column, bit n is row n
+        self.columnHeights = [Well.WELL_ROWS] * Well.WELL_COLUMNS  # highest filled row of each column
+
+        # squares and stacked blocks are stored in fixed slots, clearing or inserting rows only
+        # reorders the row <-> slot tables instead of moving every block to a new square
+        self.rowSlots = range(Well.WELL_ROWS)   # row -> slot
+        self.slotRows = range(Well.WELL_ROWS)   # slot -> row
+        self.squares = range(Well.WELL_ROWS * Well.WELL_COLUMNS)
+        self.stackedBlocks = dict()             # slot -> blocks in the stack
+        self.currentTetrad = None
+        self.ghostTetrad = None
+
+        self.dropTimer = 20
+        self.lockTimer = 10
+        
+        self.lines = 0
+        self.gravity = 0
+
+
+    def Build(self):
+        #create all the squares, give them slot/column coordinates
+        for slot in range(Well.WELL_ROWS):
+            for column in range(Well.WELL_COLUMNS):
+                    self.squares[slot*Well.WELL_COLUMNS + column] = Square(self.eventManager, self, slot, column)
+
+        #create a dictionary that keeps rows of dropped blocks for easy line detection
+        for slot in range(Well.WELL_ROWS):
+            self.stackedBlocks[slot] = list()
+
+        self.ghostTetrad = GhostTetrad(self.eventManager)
+        self.eventManager.Post(GhostAddedEvent(self.ghostTetrad))
+
+        self.state = Well.STATE_BUILT
+        self.eventManager.Post(WellBuiltEvent(self))
+
+
+    def GetCurrentTetrad(self):
+        return self.currentTetrad
+
+    def IsBlockedOut(self):
+        """true when the current tetrad overlaps the stack, ie. it spawned on top of it"""
+        for row, column in self.currentTetrad.GetCoordinates():
+            if self.IsFilled((row, column)):
+                return True
+        return False
+
+    def AddTetrad(self, currentTetrad):
+        self.currentTetrad = currentTetrad
+        square = None
+        row, column = (-1, -1)
+
+        #give current tetrad blocks their initial squares
+        for i in range(4):
+            row, column = self.currentTetrad.GetInitialBlockCoordinates(i)
+            square = self.GetSquare((row, column))
+            self.currentTetrad.SetBlockSquare(i, square)
+        currentTetrad.SetState(Tetrad.STATE_ACTIVE)
+
+        self.UpdateGhostTetrad()
+
+    def UpdateGhostTetrad(self):
+        rowsDown = self.GetDropDistance(self.currentTetrad.GetCoordinates())
+
+        for i in range(4):
+            row, column = self.currentTetrad.GetBlockCoordinates(i)
+            self.ghostTetrad.SetBlockSquare(i, self.GetSquare((row + rowsDown, column)))
+
+        self.eventManager.Post(GhostUpdatedEvent(self.ghostTetrad))
+
+
+    def SonicDropCurrentTetrad(self):
+        rowsDown = self.GetDropDistance(self.currentTetrad.GetCoordinates())
+        self.SetCurrentTetradCoordinates([(row + rowsDown, column) for row, column in self.currentTetrad.GetCoordinates()])
+            
+        self.eventManager.Post(SonicDropEvent(self.currentTetrad))
+            
+
+    def DropCurrentTetrad(self):
+        #check to see if each block in the tetrad can move down        
+        coordinates = [(row + 1, column) for row, column in self.currentTetrad.GetCoordinates()]
+        canDrop = self.CanOccupy(coordinates)
+
+        # only move the tetrad if all the target squares are valid        
+        if canDrop == True:
+            self.SetCurrentTetradCoordinates(coordinates)
+            self.eventManager.Post(TetradDroppedEvent(self.currentTetrad))
+
+        else:
+            self.currentTetrad.SetState(Tetrad.STATE_DROPPED)
+            self.eventManager.Log("can't drop tetrad")
+
+        return canDrop
+
+    def MoveCurrentTetrad(self, direction):
+        rowOffset, columnOffset = (0, 0)
+        if direction == DIRECTION_LEFT:
+            columnOffset = -1
+        elif direction == DIRECTION_RIGHT:
+            columnOffset = 1
+        elif direction == DIRECTION_DOWN:
+            rowOffset = 1
+
+        # make sure the squares the tetrad is moving to are valid and not filled        
+        coordinates = [(row + rowOffset, column + columnOffset) for row, column in self.currentTetrad.GetCoordinates()]
+        canMove = self.CanOccupy(coordinates)
+
+        # only move the tetrad if all the target squares are valid        
+        if canMove == True:
+            self.SetCurrentTetradCoordinates(coordinates)
+            self.currentTetrad.SetState(Tetrad.STATE_ACTIVE)
+            self.eventManager.Post(TetradMovedEvent(self.currentTetrad))
+            
+            if direction != DIRECTION_DOWN:
+                self.UpdateGhostTetrad()
+        else:
+            self.eventManager.Log("can't move tetrad")
+
+        return canMove            
+
+
+    def RotateCurrentTetrad(self, direction):
+        # make sure the squares the tetrad is rotating to are valid and not filled        
+        coordinates = self.currentTetrad.GetRotatedCoordinates(direction)
+        canRotate = self.CanOccupy(coordinates)
+
+        # only rotate the tetrad if all the target squares are valid        
+        if canRotate == True:
+            self.SetCurrentTetradCoordinates(coordinates)
+            self.currentTetrad.ChangeRotationState(direction)
+            self.currentTetrad.SetState(Tetrad.STATE_ACTIVE)
+            self.eventManager.Post(TetradRotatedEvent(self.currentTetrad))
+            
+            self.UpdateGhostTetrad()
+        else:
+            self.eventManager.Log("can't rotate tetrad")
+
+        return canRotate
+
+
+    def LockCurrentTetrad(self):
+        block = None
+        row, column = (-1, -1)
+        clearedRows = list()
+        clearedBlocks = list()
+        clearedTetrads = list()
+        movedBlocks = list()
+        
+        # add current tetrad to stack, check for cleared rows
+        self.currentTetrad.noStackedBlocks = 4
+        for block in self.currentTetrad.blocks:
+            row, column = block.GetCoordinates()
+            self.rows[row] |= 1 << column
+            self.columns[column] |= 1 << row
+            if row < self.columnHeights[column]:
+                self.columnHeights[column] = row
+            self.stackedBlocks[self.rowSlots[row]].append(block)
+
+            # row 0 is padding and never cleared
+            if self.rows[row] == Well.FULL_ROW and row > 0 and row not in clearedRows:
+                clearedRows.append(row)
+
+        # if any rows were marked for clearance remove them and shift down the other rows
+        if len(clearedRows) > 0:
+            clearedRows.sort()
+            for row in range(clearedRows[-1], 0, -1):
+                slot = self.rowSlots[row]
+
+                # remove rows marked for clearance
+                if row in clearedRows:
+                    clearedBlocks.extend(self.stackedBlocks[slot])
+                    self.stackedBlocks[slot] = list()
+
+                # blocks above a cleared row will be shown one or more rows down
+                else:
+                    movedBlocks.extend(self.stackedBlocks[slot])
+
+            for block in clearedBlocks:
+                if block.tetrad != None:
+                    block.tetrad.noStackedBlocks -= 1
+                    if block.tetrad.noStackedBlocks == 0:
+                        clearedTetrads.append(block.tetrad)
+
+            self.RemoveRows(clearedRows)
+            self.ClearColumnRows(clearedRows)
+            self.lines += len(clearedRows)
+            self.eventManager.Post(StackUpdateEvent(clearedBlocks, movedBlocks))
+
+            # tetrads with every block cleared can be recycled
+            for tetrad in clearedTetrads:
+                self.eventManager.Post(TetradClearedEvent(tetrad))
+
+        self.eventManager.Log("tetrad locked")
+        self.eventManager.Post(TetradLockedEvent(self.currentTetrad))
+
+        return True
+
+    def RemoveRows(self, clearedRows):
+        """drop the cleared rows, the rows above them (bar row 0) move down and the freed
+           slots come back in as empty rows just below row 0"""
+        slots = [self.rowSlots[row] for row in clearedRows]
+        for row in reversed(clearedRows):
+            del self.rowSlots[row]
+        self.rowSlots[1:1] = slots
+
+        lowestRow = clearedRows[-1]
+        keptRows = [self.rows[row] for row in range(1, lowestRow + 1) if row not in clearedRows]
+        self.rows[1:lowestRow + 1] = array.array('H', [0] * len(clearedRows) + keptRows)
+
+        for row in range(1, clearedRows[-1] + 1):
+            self.slotRows[self.rowSlots[row]] = row
+
+    def InsertGarbageRows(self, noRows, holeColumn):
+        """push the stack up and fill the bottom rows with garbage, leaving a hole in one column"""
+        clearedBlocks = list()
+        clearedTetrads = list()
+        movedBlocks = list()
+        garbageBlocks = list()
+        garbageMask = Well.FULL_ROW & ~(1 << holeColumn)
+
+        # rows pushed out of the top of the well are lost
+        for row in range(noRows):
+            slot = self.rowSlots[row]
+            clearedBlocks.extend(self.stackedBlocks[slot])
+            self.stackedBlocks[slot] = list()
+        for block in clearedBlocks:
+            if block.tetrad != None:
+                block.tetrad.noStackedBlocks -= 1
+                if block.tetrad.noStackedBlocks == 0:
+                    clearedTetrads.append(block.tetrad)
+
+        for row in range(noRows, Well.WELL_ROWS):
+            movedBlocks.extend(self.stackedBlocks[self.rowSlots[row]])
+
+        # the current tetrad keeps its place in the well rather than moving with its squares' slots
+        coordinates = None
+        if self.currentTetrad != None:
+            coordinates = self.currentTetrad.GetCoordinates()
+
+        # recycle the top slots as the new bottom rows
+        slots = self.rowSlots[:noRows]
+        del self.rowSlots[:noRows]
+        self.rowSlots.extend(slots)
+        self.rows[:] = self.rows[noRows:] + array.array('H', [garbageMask] * noRows)
+        for row in range(Well.WELL_ROWS):
+            self.slotRows[self.rowSlots[row]] = row
+
+        for slot in slots:
+            for column in range(Well.WELL_COLUMNS):
+                if column != holeColumn:
+                    block = Block(self.eventManager)
+                    block.SetSquare(self.squares[slot*Well.WELL_COLUMNS + column])
+                    self.stackedBlocks[slot].append(block)
+                    garbageBlocks.append(block)
+
+        garbageColumn = ((1 << noRows) - 1) << (Well.WELL_ROWS - noRows)
+        for column in range(Well.WELL_COLUMNS):
+            self.columns[column] >>= noRows
+            if column != holeColumn:
+                self.columns[column] |= garbageColumn
+            self.UpdateColumnHeight(column)
+
+        self.eventManager.Post(StackUpdateEvent(clearedBlocks, movedBlocks))
+        self.eventManager.Post(GarbageInsertedEvent(garbageBlocks))
+        for tetrad in clearedTetrads:
+            self.eventManager.Post(TetradClearedEvent(tetrad))
+
+        if coordinates != None:
+            # pushed up out of the garbage, left overlapping it to top out if there is no room above
+            for rowsUp in range(min([row for row, column in coordinates]) + 1):
+                shiftedCoordinates = [(row - rowsUp, column) for row, column in coordinates]
+                if self.CanOccupy(shiftedCoordinates):
+                    coordinates = shiftedCoordinates
+                    break
+            self.SetCurrentTetradCoordinates(coordinates)
+            self.eventManager.Post(TetradMovedEvent(self.currentTetrad))
+            self.UpdateGhostTetrad()
+
+    def Snapshot(self):
+        """the well's state as an immutable WellSnapshot"""
+        currentTetrad = None
+        if self.currentTetrad != None:
+            currentTetrad = (self.currentTetrad.__class__, tuple(self.currentTetrad.GetCoordinates()),
+                             self.currentTetrad.rotationState, self.currentTetrad.state)
+        return WellSnapshot(tuple(self.rows), tuple(self.columns), tuple(self.columnHeights), currentTetrad,
+                            self.dropTimer, self.lockTimer, self.lines, self.gravity)
+
+    def Restore(self, snapshot, currentTetrad=None):
+        """put the well back in a snapshot's state; the current tetrad is reused if it has the
+           snapshot's class unless one is given. Only the ghost update is posted, a view has to
+           be rebuilt separately."""
+        # rows that differ from the snapshot get their stack refilled with anonymous blocks,
+        # recycling the anonymous blocks already in them; the slot tables stay as they are
+        changedRows = [row for row in range(Well.WELL_ROWS) if self.rows[row] != snapshot.rows[row]]
+        spareBlocks = list()
+        for row in changedRows:
+            spareBlocks.extend([block for block in self.stackedBlocks[self.rowSlots[row]] if block.tetrad == None])
+        for row in changedRows:
+            slot = self.rowSlots[row]
+            blocks = list()
+            for column in Well.MASK_COLUMNS[snapshot.rows[row]]:
+                if spareBlocks:
+                    block = spareBlocks.pop()
+                else:
+                    block = Block(self.eventManager)
+                block.SetSquare(self.squares[slot*Well.WELL_COLUMNS + column])
+                blocks.append(block)
+            self.stackedBlocks[slot] = blocks
+
+        self.rows[:] = array.array('H', snapshot.rows)
+        self.columns[:] = snapshot.columns
+        self.columnHeights[:] = snapshot.columnHeights
+
+        self.dropTimer = snapshot.dropTimer
+        self.lockTimer = snapshot.lockTimer
+        self.lines = snapshot.lines
+        self.gravity = snapshot.gravity
+
+        if snapshot.currentTetrad == None:
+            self.currentTetrad = None
+            return
+        tetradClass, coordinates, rotationState, state = snapshot.currentTetrad
+        if currentTetrad == None:
+            currentTetrad = self.currentTetrad
+            if currentTetrad == None or currentTetrad.__class__ != tetradClass:
+                currentTetrad = tetradClass(self.eventManager)
+        self.currentTetrad = currentTetrad
+        currentTetrad.rotationState = rotationState
+        currentTetrad.SetState(state)
+        self.SetCurrentTetradCoordinates(coordinates)
+        self.UpdateGhostTetrad()
+
+    def GetSquare(self, (row, column)):
+        return self.squares[self.rowSlots[row]*Well.WELL_COLUMNS + column]
+
+    def IsFilled(self, (row, column)):
+        return (self.rows[row] & (1 << column)) != 0
+
+    def SetFilled(self, (row, column), filled=True):
+        if filled:
+            self.rows[row] |= 1 << column
+            self.columns[column] |= 1 << row
+        else:
+            self.rows[row] &= ~(1 << column)
+            self.columns[column] &= ~(1 << row)
+        self.UpdateColumnHeight(column)
+
+    def UpdateColumnHeight(self, column):
+        mask = self.columns[column]
+        if mask == 0:
+            self.columnHeights[column] = Well.WELL_ROWS
+        else:
+            self.columnHeights[column] = (mask & -mask).bit_length() - 1
+
+    def ClearColumnRows(self, clearedRows):
+        """remove cleared rows from the column bitmasks, shifting the rows above them down"""
+        for row in sorted(clearedRows):
+            # row 0 is never shifted down, same as the row bitmasks
+            belowMask = ~((1 << (row + 1)) - 1)
+            aboveMask = ((1 << row) - 1) & ~1
+            for column in range(Well.WELL_COLUMNS):
+                mask = self.columns[column]
+                self.columns[column] = (mask & belowMask) | ((mask & aboveMask) << 1) | (mask & 1)
+
+        for column in range(Well.WELL_COLUMNS):
+            self.UpdateColumnHeight(column)
+
+    def GetLandingRow(self, (row, column)):
+        """lowest row a block at (row, column) can fall to without passing through the stack"""
+        if row < self.columnHeights[column]:
+            return self.columnHeights[column] - 1
+
+        # the block is tucked under an overhang, find the first filled square below it
+        below = self.columns[column] >> (row + 1)
+        if below == 0:
+            return Well.WELL_ROWS - 1
+        return row + (below & -below).bit_length() - 1
+
+    def GetDropDistance(self, coordinates):
+        """number of rows the coordinates can fall before landing on the stack or the floor"""
+        return min([self.GetLandingRow(coordinate) - coordinate[0] for coordinate in coordinates])
+
+    def CanOccupy(self, coordinates):
+        """test (row, column) coordinates against the row bitmasks, true if all are inside the well and empty"""
+        rows = self.rows
+        for row, column in coordinates:
+            if row < 0 or row >= Well.WELL_ROWS or column < 0 or column >= Well.WELL_COLUMNS:
+                return False
+            if rows[row] & (1 << column):
+                return False
+        return True
+
+    def SetCurrentTetradCoordinates(self, coordinates):
+        for i in range(4):
+            self.currentTetrad.SetBlockSquare(i, self.GetSquare(coordinates[i]))
+
+    def OnTetradMoveRequest(self, event):
+        if self.currentTetrad == None:
+            return
+
+        if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE or self.currentTetrad.GetState() == Tetrad.STATE_DROPPED:
+            if self.MoveCurrentTetrad(event.direction) == True:
+                self.lockTimer = 10 #successful move resets lock timer
+                
+        # pressing down again locks piece
+        if self.currentTetrad.GetState() == Tetrad.STATE_DROPPED and event.direction == DIRECTION_DOWN:
+                self.lockTimer = 1 
+
+    def OnSonicDropRequest(self, event):
+        if self.currentTetrad == None:
+            return
+
+        if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE:
+            self.SonicDropCurrentTetrad()
+
+    def OnTetradRotateRequest(self, event):
+        if self.currentTetrad == None:
+            return
+
+        if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE or self.currentTetrad.GetState() == Tetrad.STATE_DROPPED:
+            if self.RotateCurrentTetrad(event.direction) == True:
+                self.lockTimer = 10 #successful rotate resets lock timer
+
+    def OnTick(self, event):
+        if self.currentTetrad == None:
+            return
+
+        if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE:
+            self.dropTimer -= 1
+            if self.dropTimer == 0:               
+                self.DropCurrentTetrad()
+                self.dropTimer = 20
+                
+        elif self.currentTetrad.GetState() == Tetrad.STATE_DROPPED:
+            self.lockTimer -= 1
+            if self.lockTimer == 0:
+                self.LockCurrentTetrad()
+                self.lockTimer = 10
+
+
+class Square:
+    """Model for a square of the well that could be filled with a block,
+       a view onto the well's row bitmasks"""
+    def __init__(self, eventManager, well, slot, column):
+        self.eventManager = eventManager
+        #self.eventManager.RegisterListener(self)
+
+        self.well = well
+        self.slot = slot    # the well maps the slot to the row it currently holds
+        self.column = column
+        self.mask = 1 << column
+
+    def GetCoordinates(self):
+        return (self.well.slotRows[self.slot], self.column)
+
+    def IsFilled(self):
+        return (self.well.rows[self.well.slotRows[self.slot]] & self.mask) != 0
+
+    def SetFilled(self, filled=True):
+        self.well.SetFilled(self.GetCoordinates(), filled)
+
+
+
+class Block:
+    """Model for the individual blocks that make up tetrads and the pile at the bottom."""
+    
+    def __init__(self, eventManager, tetrad=None):
+        self.eventManager = eventManager
+        #self.eventManager.RegisterListener
+
+        #the tetrad the block belongs to
+        self.tetrad = tetrad
+
+        #the current square the block occupies
+        self.square = None
+
+
+    def GetCoordinates(self):
+        if self.square == None:
+            self.eventManager.Log("block has no coordinates")
+            return (-1, -1)
+        return self.square.GetCoordinates()
+
+    def SetSquare(self, square):
+        self.square = square
+
+    def GetSquare(self):
+        return self.square
+
+
+
+
+def CompileRotationOffsets(rotationStates):
+    """compile the block coordinates of each rotation state, listed clockwise from
+       the initial state, into an immutable table of per block (row, column)
+       offsets indexed by [rotation state][direction]"""
+    noStates = len(rotationStates)
+    table = []
+    for state in range(noStates):
+        offsets = [((0, 0),) * 4] * (DIRECTION_CCW + 1)
+        for direction, nextState in ((DIRECTION_CW, (state + 1) % noStates), (DIRECTION_CCW, (state - 1) % noStates)):
+            offsets[direction] = tuple([(nextRow - row, nextColumn - column) for (row, column), (nextRow, nextColumn)
+                                        in zip(rotationStates[state], rotationStates[nextState])])
+        table.append(tuple(offsets))
+    return tuple(table)
+
+
+class Tetrad:
+    """Model for the tetrads that fall from the top into the pile at the bottom."""
+
+    STATE_INACTIVE = 0
+    STATE_ACTIVE = 1
+    STATE_DROPPED = 2
+    STATE_LOCKED = 3
+
+    # block coordinates for every rotation state, subclasses define their shapes as data
+    ROTATION_STATES = (((-1, -1),) * 4,) * 4
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+    
+    def __init__(self, eventManager):
+        self.eventManager = eventManager
+        #self.eventManager.RegisterListener(self)
+
+        # create tetrads blocks
+        self.blocks = range(4)
+        for i in range(0, 4):
+            self.blocks[i] = Block(eventManager, self)
+
+        self.state = self.STATE_INACTIVE
+        self.rotationState = 0
+        self.noStackedBlocks = 0    # blocks still in the well's stack once locked
+        
+        self.colour = GREY
+        self.initialBlockCoordinates = self.ROTATION_STATES[0]
+
+
+    def GetBlock(self, blockIndex):
+        return self.blocks[blockIndex]
+
+    def GetInitialBlockCoordinates(self, blockIndex):
+        return self.initialBlockCoordinates[blockIndex]
+    
+    def GetPreviewBlockCoordinates(self, blockIndex):
+        row, column = self.initialBlockCoordinates[blockIndex]
+        return (row - 2, column - 3)
+    
+    def GetColour(self):
+        return self.colour
+
+
+    def SetState(self, state):
+        self.state = state
+        
+    def GetState(self):
+        return self.state
+
+
+    def Reset(self):
+        """return a recycled tetrad to the state of a newly created one"""
+        self.ClearBlocksSquares()
+        self.ResetRotationState()
+        self.SetState(Tetrad.STATE_INACTIVE)
+        self.noStackedBlocks = 0
+
+    def ResetRotationState(self):
+        self.rotationState = 0
+        
+    def ChangeRotationState(self, direction):
+        if direction == DIRECTION_CW:
+            self.rotationState = (self.rotationState + 1) % len(self.ROTATION_STATES)
+        else:
+            self.rotationState = (self.rotationState - 1) % len(self.ROTATION_STATES)
+        
+    def GetRotationState(self):
+        return self.rotationState
+    
+    def SetBlockSquare(self, blockIndex, square):
+        self.blocks[blockIndex].SetSquare(square)
+
+    def GetBlockSquare(self, blockIndex):
+        square = self.blocks[blockIndex].GetSquare()
+        return square
+    
+    def ClearBlocksSquares(self):
+        for block in self.blocks:
+            block.SetSquare(None)
+
+    def GetBlockCoordinates(self, blockIndex):
+        return self.blocks[blockIndex].GetCoordinates()
+
+    def GetCoordinates(self):
+        return [block.GetCoordinates() for block in self.blocks]
+
+    def GetRotatedBlockCoordinates(self, blockIndex, direction):
+        row, column = self.GetBlockCoordinates(blockIndex)
+        rowOffset, columnOffset = self.ROTATION_OFFSETS[self.rotationState][direction][blockIndex]
+        return (row + rowOffset, column + columnOffset)
+
+    def GetRotatedCoordinates(self, direction):
+        offsets = self.ROTATION_OFFSETS[self.rotationState][direction]
+        return [(row + rowOffset, column + columnOffset) for (row, column), (rowOffset, columnOffset)
+                in zip(self.GetCoordinates(), offsets)]
+
+    def GetRandomTetrad(eventManager, tetradPool=None, randomizer=None):
+        if randomizer == None:
+            tetradClass = TETRAD_CLASSES[random.randint(1,7) - 1]
+        else:
+            tetradClass = TETRAD_CLASSES[randomizer.GetNext()]
+        if tetradPool == None:
+            return tetradClass(eventManager)
+        return tetradPool.Acquire(tetradClass)
+    GetRandomTetrad = Callable(GetRandomTetrad)
+
+
+
+class GhostTetrad(Tetrad):
+    """the ghost or shadow of the current piece"""
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = GREY
+        self.visible = True
+        
+    def SetVisible(self, visible=True):
+        self.visible = visible
+        
+    def IsVisible(self):
+        return self.visible
+        
+
+class OTetrad(Tetrad):
+    """the 'O' shaped tetrad
+            block indices: |0|1|
+                           |3|2|
+            rotates about centre
+    """
+    ROTATION_STATES = (((2, 4), (2, 5), (3, 5), (3, 4)),
+                       ((2, 5), (3, 5), (3, 4), (2, 4)),
+                       ((3, 5), (3, 4), (2, 4), (2, 5)),
+                       ((3, 4), (2, 4), (2, 5), (3, 5)))
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = YELLOW
+
+
+class ITetrad(Tetrad):
+    """the 'I' shaped tetrad
+            block indices: |0|1|2|3|
+            rotates about block 2
+    """    
+    ROTATION_STATES = (((2, 3), (2, 4), (2, 5), (2, 6)),
+                       ((0, 5), (1, 5), (2, 5), (3, 5)))
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = RED
+
+
+class TTetrad(Tetrad):
+    """the 'T' shaped tetrad
+            block indices: |0|1|2|
+                             |3|
+            rotates about block 1
+    """    
+    ROTATION_STATES = (((2, 3), (2, 4), (2, 5), (3, 4)),
+                       ((1, 4), (2, 4), (3, 4), (2, 3)),
+                       ((2, 5), (2, 4), (2, 3), (1, 4)),
+                       ((3, 4), (2, 4), (1, 4), (2, 5)))
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = CYAN
+
+
+class LTetrad(Tetrad):
+    """the 'L' shaped tetrad
+            block indices: |0|1|2|
+                           |3|
+            rotates about block 1
+    """
+    ROTATION_STATES = (((2, 3), (2, 4), (2, 5), (3, 3)),
+                       ((1, 4), (2, 4), (3, 4), (1, 3)),
+                       ((2, 5), (2, 4), (2, 3), (1, 5)),
+                       ((3, 4), (2, 4), (1, 4), (3, 5)))
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = ORANGE
+
+
+class JTetrad(Tetrad):
+    """the 'J' shaped tetrad
+            block indices: |0|1|2|
+                               |3|
+            rotates about block 1
+    """
+    ROTATION_STATES = (((2, 3), (2, 4), (2, 5), (3, 5)),
+                       ((1, 4), (2, 4), (3, 4), (3, 3)),
+                       ((2, 5), (2, 4), (2, 3), (1, 3)),
+                       ((3, 4), (2, 4), (1, 4), (1, 5)))
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = BLUE
+
+
+class ZTetrad(Tetrad):
+    """the 'Z' shaped tetrad
+            block indices: |0|1|
+                             |2|3|
+            rotates about block 2
+    """
+    ROTATION_STATES = (((2, 3), (2, 4), (3, 4), (3, 5)),
+                       ((2, 5), (3, 5), (3, 4), (4, 4)))
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = GREEN
+
+
+class STetrad(Tetrad):
+    """the 'S' shaped tetrad
+            block indices:   |0|1|
+                           |2|3|
+            rotates about block 0
+    """
+    ROTATION_STATES = (((2, 4), (2, 5), (3, 3), (3, 4)),
+                       ((2, 4), (1, 4), (3, 5), (2, 5)))
+    ROTATION_OFFSETS = CompileRotationOffsets(ROTATION_STATES)
+
+    def __init__(self, eventManager):
+        Tetrad.__init__(self, eventManager)
+        self.colour = MAGENTA
+
+
+TETRAD_CLASSES = (OTetrad, ITetrad, TTetrad, ZTetrad, STetrad, LTetrad, JTetrad)
+
+
+
+class TetradPool:
+    """Recycles tetrads, along with their blocks, once every block has been cleared from the stack."""
+    def __init__(self, eventManager):
+        self.eventManager = eventManager
+
+        self.freeTetrads = dict()   # tetrad class -> tetrads ready for reuse
+        self.hits = 0
+        self.misses = 0
+
+    def Acquire(self, tetradClass):
+        freeTetrads = self.freeTetrads.get(tetradClass)
+        if freeTetrads:
+            self.hits += 1
+            tetrad = freeTetrads.pop()
+            tetrad.Reset()
+        else:
+            self.misses += 1
+            tetrad = tetradClass(self.eventManager)
+        return tetrad
+
+    def Release(self, tetrad):
+        self.freeTetrads.setdefault(tetrad.__class__, []).append(tetrad)
+
+    def GetHitRate(self):
+        if self.hits + self.misses == 0:
+            return 0.0
+        return float(self.hits) / (self.hits + self.misses)
+
+    def GetStats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hitRate': self.GetHitRate(),
+                'free': sum([len(tetrads) for tetrads in self.freeTetrads.values()])}
+
+
+
+class Randomizer:
+    """Deals tetrad types, as indices into TETRAD_CLASSES, from sequences generated a chunk
+       at a time by the subclass's GenerateChunk(noTetrads). Each player has its own
+       randomizer with its own generator, seeded ones deal the same sequence every run,
+       unseeded ones are seeded from the OS."""
+
+    CHUNK_SIZE = 1024
+
+    def __init__(self, seed=None, chunkSize=CHUNK_SIZE):
+        self.seed = seed
+        self.random = random.Random(seed)   # never the random module's, restores rewind it
+        self.chunkSize = chunkSize
+
+        # only the chunk being dealt is kept, with the generator state it was generated from
+        # so a restored state can generate it again
+        self.chunkIndex = -1
+        self.chunkStart = None
+        self.chunk = list()
+        self.position = 0
+        self.noDealt = 0
+
+    def GetNext(self):
+        if self.position == len(self.chunk):
+            self.chunkIndex += 1
+            self.chunkStart = self.GetGeneratorState()
+            self.chunk = self.GenerateChunk(self.chunkSize)
+            self.position = 0
+        index = self.chunk[self.position]
+        self.position += 1
+        self.noDealt += 1
+        return index
+
+    def GetState(self):
+        chunkStart = self.chunkStart
+        if self.chunkIndex < 0:
+            chunkStart = self.GetGeneratorState()
+        return (self.chunkIndex, chunkStart, self.position, self.noDealt)
+
+    def SetState(self, (chunkIndex, chunkStart, position, noDealt)):
+        # a state in another chunk generates that chunk again, leaving the generator after it
+        if chunkIndex != self.chunkIndex:
+            self.SetGeneratorState(chunkStart)
+            self.chunkIndex = chunkIndex
+            self.chunkStart = None
+            self.chunk = list()
+            if chunkIndex >= 0:
+                self.chunkStart = chunkStart
+                self.chunk = self.GenerateChunk(self.chunkSize)
+        self.position = position
+        self.noDealt = noDealt
+
+    def GetGeneratorState(self):
+        """everything GenerateChunk depends on"""
+        return self.random.getstate()
+
+    def SetGeneratorState(self, state):
+        self.random.setstate(state)
+
+    def GetSequence(self, noTetrads):
+        """deal the next noTetrads types at once, eg. to hand to a SequenceRandomizer in another process"""
+        return [self.GetNext() for i in range(noTetrads)]
+
+
+class PureRandomizer(Randomizer):
+    """every type equally likely every time"""
+    def GenerateChunk(self, noTetrads):
+        randint = self.random.randint
+        return [randint(1, 7) - 1 for i in range(noTetrads)]
+
+
+class BagRandomizer(Randomizer):
+    """deals each of the seven types once, in a shuffled order, before dealing any again"""
+    def GenerateChunk(self, noTetrads):
+        chunk = list()
+        while len(chunk) < noTetrads:
+            bag = range(len(TETRAD_CLASSES))
+            self.random.shuffle(bag)
+            chunk.extend(bag)
+        return chunk
+
+
+class HistoryRandomizer(Randomizer):
+    """rerolls a type that is in the last few dealt, a few times at most, so repeats are rare"""
+
+    HISTORY_SIZE = 4
+    NO_ROLLS = 4
+
+    def __init__(self, seed=None, chunkSize=Randomizer.CHUNK_SIZE):
+        Randomizer.__init__(self, seed, chunkSize)
+        # start as though S and Z tetrads were just dealt, so neither comes first
+        self.history = [TETRAD_CLASSES.index(ZTetrad), TETRAD_CLASSES.index(STetrad)] * (HistoryRandomizer.HISTORY_SIZE / 2)
+
+    def GetGeneratorState(self):
+        return (self.random.getstate(), tuple(self.history))
+
+    def SetGeneratorState(self, (randomState, history)):
+        self.random.setstate(randomState)
+        self.history = list(history)
+
+    def GenerateChunk(self, noTetrads):
+        chunk = list()
+        for i in range(noTetrads):
+            for roll in range(HistoryRandomizer.NO_ROLLS):
+                index = self.random.randint(0, len(TETRAD_CLASSES) - 1)
+                if index not in self.history:
+                    break
+            self.history.pop(0)
+            self.history.append(index)
+            chunk.append(index)
+        return chunk
+
+
+class SequenceRandomizer(Randomizer):
+    """replays a sequence of types dealt earlier, possibly by another process"""
+    def __init__(self, sequence):
+        Randomizer.__init__(self)
+        self.sequence = list(sequence)
+
+    def GenerateChunk(self, noTetrads):
+        # the whole sequence is the one chunk
+        if self.chunkIndex > 0:
+            raise IndexError("sequence of %d tetrads exhausted" % self.noDealt)
+        return self.sequence
+
+    def GetGeneratorState(self):
+        return None
+
+    def SetGeneratorState(self, state):
+        pass
+
+
+RANDOMIZERS = {
+    'random': PureRandomizer,
+    'bag': BagRandomizer,
+    'history': HistoryRandomizer}
+
+def GetRandomizer(mode, seed=None):
+    return RANDOMIZERS[mode](seed)
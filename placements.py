@@ -0,0 +1,211 @@
+"""Side effect free search for every position a tetrad can lock in, working on
+   the well's row bitmasks rather than on a live Well."""
+from model import Well
+from headless import ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_SONIC_DROP
+
+
+ALL_ROWS = (1 << Well.WELL_ROWS) - 1
+FLOOR = ~ALL_ROWS               # row offsets that would put a block below the well
+COLUMN_OFFSET = Well.WELL_COLUMNS   # column offsets are stored from -WELL_COLUMNS up
+
+
+
+class Placement:
+    """A position a tetrad can lock in, the path that takes it there is searched for on request."""
+    def __init__(self, search, start, rotationState, rowOffset, columnOffset, coordinates):
+        self.search = search
+        self.start = start
+        self.rotationState = rotationState
+        self.rowOffset = rowOffset          # rows and columns moved from the tetrad's initial coordinates
+        self.columnOffset = columnOffset
+        self.coordinates = coordinates      # (row, column) of each block
+        self.path = None
+
+    def GetCoordinates(self):
+        return self.coordinates
+
+    def GetPath(self):
+        """shortest list of ACTION_* constants that takes the tetrad from its start to this placement"""
+        if self.path == None:
+            self.path = self.search.GetPath(self.start, (self.rotationState, self.rowOffset, self.columnOffset))
+        return self.path
+
+
+
+class PlacementSearch:
+    """Where one tetrad class fits in one well state.
+
+       For every rotation state and column offset the search keeps a bitmask of the row
+       offsets that collide with the stack or the floor, so testing a position is a single
+       bit test and the reachable row offsets can be flood filled a whole column at a time."""
+
+    def __init__(self, rows, tetradClass):
+        self.rows = rows
+        self.tetradClass = tetradClass
+        self.rotationStates = tetradClass.ROTATION_STATES
+        self.noStates = len(self.rotationStates)
+
+        # column bitmasks, bit n is row n
+        columns = [0] * Well.WELL_COLUMNS
+        for row in range(Well.WELL_ROWS):
+            mask = rows[row]
+            column = 0
+            while mask:
+                if mask & 1:
+                    columns[column] |= 1 << row
+                mask >>= 1
+                column += 1
+
+        # blocked[rotation][column offset + COLUMN_OFFSET], bit n set if row offset n collides
+        self.blocked = list()
+        for coordinates in self.rotationStates:
+            blocked = [-1] * (2 * Well.WELL_COLUMNS + 1)
+            minColumn = min([column for row, column in coordinates])
+            maxColumn = max([column for row, column in coordinates])
+            for columnOffset in range(-minColumn, Well.WELL_COLUMNS - maxColumn):
+                mask = 0
+                for row, column in coordinates:
+                    mask |= (columns[column + columnOffset] | FLOOR) >> row
+                blocked[columnOffset + COLUMN_OFFSET] = mask
+            self.blocked.append(blocked)
+
+    def Fits(self, (rotation, rowOffset, columnOffset)):
+        if rowOffset < 0 or columnOffset < -COLUMN_OFFSET or columnOffset > COLUMN_OFFSET:
+            return False
+        return (self.blocked[rotation][columnOffset + COLUMN_OFFSET] >> rowOffset) & 1 == 0
+
+    def GetDropDistance(self, (rotation, rowOffset, columnOffset)):
+        below = self.blocked[rotation][columnOffset + COLUMN_OFFSET] >> (rowOffset + 1)
+        return (below & -below).bit_length() - 1
+
+    def GetPlacements(self, start):
+        """every distinct set of squares the tetrad can lock in from the start position"""
+        if not self.Fits(start):
+            return []
+
+        rotation, rowOffset, columnOffset = start
+        noOffsets = 2 * Well.WELL_COLUMNS + 1
+        reached = [[0] * noOffsets for i in range(self.noStates)]
+        reached[rotation][columnOffset + COLUMN_OFFSET] = 1 << rowOffset
+        free = [[~blocked & ALL_ROWS for blocked in self.blocked[i]] for i in range(self.noStates)]
+
+        # flood fill the reachable row offsets until moving, rotating and dropping add nothing new
+        changed = True
+        while changed:
+            changed = False
+            for rotation in range(self.noStates):
+                for offset in range(1, noOffsets - 1):
+                    reach = reached[rotation][offset]
+                    if reach == 0:
+                        continue
+
+                    # soft drop: spread down through runs of free row offsets
+                    fits = free[rotation][offset]
+                    reach |= (reach << 1) & fits
+                    fits &= fits << 1
+                    reach |= (reach << 2) & fits
+                    fits &= fits << 2
+                    reach |= (reach << 4) & fits
+                    fits &= fits << 4
+                    reach |= (reach << 8) & fits
+                    fits &= fits << 8
+                    reach |= (reach << 16) & fits
+                    reached[rotation][offset] = reach
+
+                    for nextRotation, nextOffset in ((rotation, offset - 1), (rotation, offset + 1),
+                                                     ((rotation + 1) % self.noStates, offset),
+                                                     ((rotation - 1) % self.noStates, offset)):
+                        spread = reach & free[nextRotation][nextOffset]
+                        if spread & ~reached[nextRotation][nextOffset]:
+                            reached[nextRotation][nextOffset] |= spread
+                            changed = True
+
+        # reachable offsets with the stack or floor right below are where the tetrad locks
+        placements = list()
+        lockedSquares = set()
+        for rotation in range(self.noStates):
+            for offset in range(noOffsets):
+                locks = reached[rotation][offset] & (self.blocked[rotation][offset] >> 1)
+                rowOffset = 0
+                while locks:
+                    if locks & 1:
+                        columnOffset = offset - COLUMN_OFFSET
+                        coordinates = tuple([(row + rowOffset, column + columnOffset)
+                                             for row, column in self.rotationStates[rotation]])
+                        squares = frozenset(coordinates)
+                        if squares not in lockedSquares:
+                            lockedSquares.add(squares)
+                            placements.append(Placement(self, start, rotation, rowOffset, columnOffset, coordinates))
+                    locks >>= 1
+                    rowOffset += 1
+        return placements
+
+    def GetPath(self, start, target):
+        """breadth first search for the fewest actions between two positions, None if unreachable"""
+        parents = {start: None}     # position -> (previous position, action)
+        queue = [start]
+        i = 0
+        while i < len(queue):
+            position = queue[i]
+            i += 1
+            if position == target:
+                path = list()
+                previous = parents[position]
+                while previous != None:
+                    path.append(previous[1])
+                    previous = parents[previous[0]]
+                path.reverse()
+                return tuple(path)
+
+            rotation, rowOffset, columnOffset = position
+            distance = self.GetDropDistance(position)
+            nextPositions = [(ACTION_ROTATE_CW, ((rotation + 1) % self.noStates, rowOffset, columnOffset)),
+                             (ACTION_ROTATE_CCW, ((rotation - 1) % self.noStates, rowOffset, columnOffset)),
+                             (ACTION_LEFT, (rotation, rowOffset, columnOffset - 1)),
+                             (ACTION_RIGHT, (rotation, rowOffset, columnOffset + 1))]
+            if distance > 0:
+                nextPositions.append((ACTION_SONIC_DROP, (rotation, rowOffset + distance, columnOffset)))
+                nextPositions.append((ACTION_DOWN, (rotation, rowOffset + 1, columnOffset)))
+
+            for action, nextPosition in nextPositions:
+                if nextPosition not in parents and self.Fits(nextPosition):
+                    parents[nextPosition] = (position, action)
+                    queue.append(nextPosition)
+        return None
+
+
+
+def GetTetradPosition(tetrad):
+    """(rotation state, row offset, column offset) of a tetrad that is in the well"""
+    rotationState = tetrad.GetRotationState()
+    row, column = tetrad.GetBlockCoordinates(0)
+    initialRow, initialColumn = tetrad.ROTATION_STATES[rotationState][0]
+    return (rotationState, row - initialRow, column - initialColumn)
+
+
+def GetPlacements(rows, tetradClass, start=(0, 0, 0)):
+    """every distinct set of squares a tetrad can lock in, searching the (rotation, row, column)
+       states it can reach from start, including soft drop tucks; rows are only read"""
+    return PlacementSearch(rows, tetradClass).GetPlacements(start)
+
+
+def GetWellPlacements(well):
+    """placements of the well's current tetrad from where it is now"""
+    tetrad = well.GetCurrentTetrad()
+    return GetPlacements(well.rows, tetrad.__class__, GetTetradPosition(tetrad))
+
+
+def LockPlacement(rows, coordinates):
+    """the row bitmasks after locking squares into the stack, following Well.LockCurrentTetrad:
+       returns (rows, number of lines cleared)"""
+    rows = list(rows)
+    for row, column in coordinates:
+        rows[row] |= 1 << column
+
+    clearedRows = [row for row in set([row for row, column in coordinates])
+                   if row > 0 and rows[row] == Well.FULL_ROW]
+    if clearedRows:
+        for row in sorted(clearedRows, reverse=True):
+            del rows[row]
+        rows[1:1] = [0] * len(clearedRows)
+    return rows, len(clearedRows)
@@ -0,0 +1,112 @@
+"""Counts and times the work EventManager.ConsumeEventQueue hands out, per event class and
+   per listener handler, when an EventProfiler is attached with EventManager.SetProfiler."""
+import sys, timeit
+
+
+NO_BUCKETS = 32     # histogram bucket n counts samples under 2**n (microseconds or events)
+
+
+
+class Histogram:
+    """count, total, maximum and power of two histogram of samples"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+        self.buckets = [0] * NO_BUCKETS
+
+    def Add(self, value, bucket):
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+        self.buckets[min(bucket, NO_BUCKETS - 1)] += 1
+
+    def GetSnapshot(self):
+        mean = 0
+        if self.count:
+            mean = self.total / float(self.count)
+        return {'count': self.count, 'total': self.total, 'mean': mean, 'max': self.maximum,
+                'histogram': list(self.buckets)}
+
+
+class LatencyHistogram(Histogram):
+    """histogram of durations in seconds, bucketed by whole microseconds"""
+    def AddTime(self, seconds):
+        self.Add(seconds, int(seconds * 1000000).bit_length())
+
+
+
+class EventProfiler:
+    """Latency histograms per event class and per (listener class, handler), the depth of the
+       queue each time it is consumed, and how many ticks ran over the frame budget."""
+
+    def __init__(self, tickBudget=1.0 / 60, dumpInterval=None, output=sys.stdout):
+        self.timer = timeit.default_timer
+        self.tickBudget = tickBudget        # seconds a tick may take and still make the frame
+        self.dumpInterval = dumpInterval    # seconds between dumps to output, None to never dump
+        self.output = output
+        self.Reset()
+
+    def Reset(self):
+        self.events = dict()        # event class -> LatencyHistogram of handling the event
+        self.handlers = dict()      # (listener class, handler function) -> LatencyHistogram
+        self.queueDepths = Histogram()
+        self.tickTimes = LatencyHistogram()
+        self.overBudgetTicks = 0
+        self.lastDump = self.timer()
+
+    def RecordHandler(self, listener, handler, seconds):
+        key = (listener.__class__, handler)
+        histogram = self.handlers.get(key)
+        if histogram == None:
+            histogram = self.handlers[key] = LatencyHistogram()
+        histogram.AddTime(seconds)
+
+    def RecordEvent(self, eventClass, seconds):
+        histogram = self.events.get(eventClass)
+        if histogram == None:
+            histogram = self.events[eventClass] = LatencyHistogram()
+        histogram.AddTime(seconds)
+
+    def RecordQueue(self, noEvents, ticked, seconds):
+        """a consumed queue of noEvents events, ticked if a TickEvent was among them"""
+        self.queueDepths.Add(noEvents, noEvents.bit_length())
+        if ticked:
+            self.tickTimes.AddTime(seconds)
+            if seconds > self.tickBudget:
+                self.overBudgetTicks += 1
+
+        if self.dumpInterval != None and self.timer() - self.lastDump >= self.dumpInterval:
+            self.Dump()
+
+
+    def GetSnapshot(self):
+        """the counters so far as plain dicts and lists, keyed by class and handler names"""
+        return {
+            'events': dict([(eventClass.__name__, histogram.GetSnapshot())
+                            for eventClass, histogram in self.events.items()]),
+            'handlers': dict([('%s.%s' % (listenerClass.__name__, handler.__name__), histogram.GetSnapshot())
+                              for (listenerClass, handler), histogram in self.handlers.items()]),
+            'queueDepths': self.queueDepths.GetSnapshot(),
+            'ticks': self.tickTimes.GetSnapshot(),
+            'overBudgetTicks': self.overBudgetTicks,
+            'tickBudget': self.tickBudget}
+
+    def Dump(self, noRows=10):
+        """write the ticks and the handlers taking the most time to output"""
+        self.lastDump = self.timer()
+        snapshot = self.GetSnapshot()
+        ticks = snapshot['ticks']
+        write = self.output.write
+
+        write('%d ticks, mean %.3fms, max %.3fms, %d over the %.1fms budget, mean queue depth %.1f\n' % (
+            ticks['count'], ticks['mean'] * 1000, ticks['max'] * 1000, snapshot['overBudgetTicks'],
+            self.tickBudget * 1000, snapshot['queueDepths']['mean']))
+        for title, histograms in (('handler', snapshot['handlers']), ('event', snapshot['events'])):
+            write('  %-40s %10s %10s %10s %10s\n' % (title, 'count', 'total ms', 'mean us', 'max us'))
+            rows = sorted(histograms.items(), key=lambda item: item[1]['total'], reverse=True)[:noRows]
+            for name, histogram in rows:
+                write('  %-40s %10d %10.2f %10.1f %10.1f\n' % (name, histogram['count'], histogram['total'] * 1000,
+                                                               histogram['mean'] * 1000000, histogram['max'] * 1000000))
+        self.output.flush()
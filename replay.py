@@ -0,0 +1,201 @@
+"""Records a game's input requests to a compact binary log and plays logs back headlessly.
+
+   A replay is the magic REPLAY_MAGIC, a version byte, the randomizer mode and seed the
+   player's tetrads were dealt with, then one varint per request: the ticks since the
+   previous request shifted left three bits, or'd with the request's ACTION_* code.
+   The log ends with an ACTION_END record at the tick the recording stopped.
+
+   python replay.py game.replay"""
+import sys, time, threading, Queue
+from model import *
+from events import *
+from headless import *
+
+
+REPLAY_MAGIC = 'STMR'
+REPLAY_VERSION = 1
+
+ACTION_BITS = 3
+ACTION_END = 7      # no more requests, the recording stopped at this tick
+
+
+
+def EncodeVarint(value, buffer):
+    """append an unsigned integer to a bytearray seven bits at a time, low bits first"""
+    while value >= 0x80:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def DecodeVarint(data, position):
+    """(value, position after it) of the varint at position in a bytearray"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def GetAction(event):
+    """ACTION_* code of a request event"""
+    if isinstance(event, TetradMoveRequest):
+        if event.direction == DIRECTION_LEFT:
+            return ACTION_LEFT
+        elif event.direction == DIRECTION_RIGHT:
+            return ACTION_RIGHT
+        return ACTION_DOWN
+    elif isinstance(event, TetradRotateRequest):
+        if event.direction == DIRECTION_CW:
+            return ACTION_ROTATE_CW
+        return ACTION_ROTATE_CCW
+    elif isinstance(event, SonicDropRequest):
+        return ACTION_SONIC_DROP
+    return ACTION_HOLD
+
+
+
+class ReplayWriter(threading.Thread):
+    """Writes encoded chunks to the replay file on a background thread so the game loop
+       never waits on the disk."""
+    def __init__(self, path):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.file = open(path, 'wb')
+        self.chunks = Queue.Queue()
+        self.start()
+
+    def run(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk == None:
+                break
+            self.file.write(chunk)
+        self.file.close()
+
+    def Write(self, chunk):
+        self.chunks.put(str(chunk))
+
+    def Close(self):
+        self.chunks.put(None)
+        self.join()
+
+
+
+class ReplayRecorder:
+    """Logs the move, rotate, sonic drop and swap requests a game handles, with the tick they
+       were handled after, counting ticks from the game start."""
+
+    FLUSH_SIZE = 4096   # bytes encoded before they are handed to the writer
+
+    def __init__(self, eventManager, path, randomizerMode, seed):
+        self.eventManager = eventManager
+        self.eventManager.RegisterListener(self, {
+            GameStartedEvent: self.OnGameStarted,
+            TickEvent: self.OnTick,
+            TetradMoveRequest: self.OnRequest,
+            TetradRotateRequest: self.OnRequest,
+            SonicDropRequest: self.OnRequest,
+            TetradSwapRequest: self.OnRequest,
+            QuitEvent: self.OnQuit})
+
+        self.writer = ReplayWriter(path)
+        self.buffer = bytearray(REPLAY_MAGIC)
+        self.buffer.append(REPLAY_VERSION)
+        EncodeVarint(len(randomizerMode), self.buffer)
+        self.buffer.extend(randomizerMode)
+        EncodeVarint(seed, self.buffer)
+
+        self.started = False
+        self.ticks = 0
+        self.lastTick = 0
+        self.noRequests = 0
+
+
+    def Record(self, action):
+        EncodeVarint(((self.ticks - self.lastTick) << ACTION_BITS) | action, self.buffer)
+        self.lastTick = self.ticks
+        if len(self.buffer) >= ReplayRecorder.FLUSH_SIZE:
+            self.writer.Write(self.buffer)
+            self.buffer = bytearray()
+
+    def Close(self):
+        """end the log and wait for the writer to finish with it"""
+        if self.writer == None:
+            return
+        self.Record(ACTION_END)
+        self.writer.Write(self.buffer)
+        self.writer.Close()
+        self.writer = None
+
+
+    def OnGameStarted(self, event):
+        self.started = True
+
+    def OnTick(self, event):
+        if self.started:
+            self.ticks += 1
+
+    def OnRequest(self, event):
+        if self.started and self.writer != None:
+            self.Record(GetAction(event))
+            self.noRequests += 1
+
+    def OnQuit(self, event):
+        self.Close()
+
+
+
+def ReadReplay(path):
+    """(randomizer mode, seed, [(tick, action), ...]) of a replay file, the last entry is the
+       ACTION_END record"""
+    data = bytearray(open(path, 'rb').read())
+    if data[:len(REPLAY_MAGIC)] != bytearray(REPLAY_MAGIC) or data[len(REPLAY_MAGIC)] != REPLAY_VERSION:
+        raise ValueError("%s is not a version %d replay" % (path, REPLAY_VERSION))
+
+    position = len(REPLAY_MAGIC) + 1
+    length, position = DecodeVarint(data, position)
+    randomizerMode = str(data[position:position + length])
+    seed, position = DecodeVarint(data, position + length)
+
+    records = list()
+    tick = 0
+    while position < len(data):
+        value, position = DecodeVarint(data, position)
+        tick += value >> ACTION_BITS
+        records.append((tick, value & ((1 << ACTION_BITS) - 1)))
+    return randomizerMode, seed, records
+
+
+def PlayReplay(path):
+    """re-simulate a replay headlessly as fast as the CPU allows, returns the engine"""
+    randomizerMode, seed, records = ReadReplay(path)
+    engine = HeadlessEngine(randomizer=GetRandomizer(randomizerMode, seed))
+    engine.Start()
+
+    # a request was handled after the tick it was recorded with and before the next one
+    for tick, action in records:
+        engine.Tick(tick - engine.ticks)
+        if action == ACTION_END or engine.IsGameOver():
+            break
+        engine.Perform(action)
+    return engine
+
+
+
+def main(arguments):
+    for path in arguments:
+        startTime = time.time()
+        engine = PlayReplay(path)
+        seconds = max(time.time() - startTime, 1e-9)
+        print '%s: %d ticks, %d pieces, %d lines in %.3fs (%.0f ticks/s)' % (
+            path, engine.ticks, engine.piecesLocked, engine.GetLines(), seconds, engine.ticks / seconds)
+
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
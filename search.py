@@ -0,0 +1,238 @@
+"""A bot that searches several tetrads ahead through the preview queue and the hold,
+   sharing the value of well states reached by different move orders through a
+   transposition table keyed by Zobrist hashes of the rows."""
+import random, multiprocessing
+from model import *
+from headless import ACTION_SONIC_DROP, ACTION_HOLD
+from placements import GetPlacements, GetTetradPosition, LockPlacement
+from bot import HeuristicPlanner, HeuristicBot
+
+
+# one random key per row and row bitmask, a well's hash is the xor of its rows' keys;
+# empty rows have a key of 0 so rows above the stack cost nothing to hash or shift
+ZOBRIST_SEED = 20100601
+ROW_KEYS = list()
+zobristRandom = random.Random(ZOBRIST_SEED)
+for row in range(Well.WELL_ROWS):
+    ROW_KEYS.append([0] + [zobristRandom.getrandbits(64) for mask in range(1, Well.FULL_ROW + 1)])
+del zobristRandom
+
+LOST = -1e9     # value of a state where the next tetrad cannot enter the well
+
+
+
+def GetHash(rows):
+    hash = 0
+    for row in range(Well.WELL_ROWS):
+        hash ^= ROW_KEYS[row][rows[row]]
+    return hash
+
+
+def LockRows(rows, hash, coordinates):
+    """LockPlacement updating the hash with only the rows that changed:
+       returns (rows, hash, number of lines cleared)"""
+    newRows, linesCleared = LockPlacement(rows, coordinates)
+
+    # rows change where the squares lock, and down from row 1 to them if lines cleared;
+    # row 0 is never cleared or shifted but a square can still lock into it
+    lockedRows = [row for row, column in coordinates]
+    firstRow = min(lockedRows)
+    if linesCleared:
+        firstRow = min(firstRow, 1)
+    for row in range(firstRow, max(lockedRows) + 1):
+        if rows[row] != newRows[row]:
+            hash ^= ROW_KEYS[row][rows[row]] ^ ROW_KEYS[row][newRows[row]]
+    return newRows, hash, linesCleared
+
+
+
+class LookaheadSearch:
+    """Beam limited depth first search over the placements of a known tetrad queue.
+
+       A state is the rows, how far along the queue the current tetrad is and the hold
+       tetrad. Each state's children are scored in one batch by the heuristic planner,
+       only the best beamWidth of them are searched further, and the value of every
+       state searched is kept in the transposition table."""
+
+    def __init__(self, queue, depth, beamWidth, weights=None):
+        self.queue = queue          # tetrad classes, the current tetrad first
+        self.depth = depth
+        self.beamWidth = beamWidth
+        self.planner = HeuristicPlanner(weights)
+        self.lineValue = self.planner.weights['linesCleared']
+
+        self.transpositions = dict()    # (hash, queue index, hold, depth left) -> value
+        self.hits = 0
+        self.misses = 0
+
+    def GetOptions(self, rows, index, hold, start=(0, 0, 0)):
+        """(placement, next queue index, next hold) of each way to play the state's next tetrad"""
+        options = list()
+        current = None
+        if index < len(self.queue):
+            current = self.queue[index]
+            for placement in GetPlacements(rows, current, start):
+                options.append((placement, index + 1, hold))
+
+        # holding swaps in the hold tetrad, or the one after the current if nothing is held
+        if hold != None:
+            if hold != current:
+                for placement in GetPlacements(rows, hold):
+                    options.append((placement, index + 1, current))
+        elif current != None and index + 1 < len(self.queue) and self.queue[index + 1] != current:
+            for placement in GetPlacements(rows, self.queue[index + 1]):
+                options.append((placement, index + 2, current))
+        return options
+
+    def GetBeam(self, rows, options):
+        """the heuristic score of every option and the indices of the best beamWidth of them"""
+        scores = self.planner.GetScores(rows, [option[0] for option in options])
+        beam = sorted(range(len(options)), key=lambda i: scores[i], reverse=True)[:self.beamWidth]
+        return scores, beam
+
+    def GetValue(self, rows, hash, index, hold, depthLeft):
+        """best value reachable from a state with depthLeft more tetrads to place"""
+        key = (hash, index, hold, depthLeft)
+        if key in self.transpositions:
+            self.hits += 1
+            return self.transpositions[key]
+        self.misses += 1
+
+        options = self.GetOptions(rows, index, hold)
+        if not options:
+            value = LOST
+        else:
+            scores, beam = self.GetBeam(rows, options)
+            if depthLeft <= 1:
+                value = scores[beam[0]]
+            else:
+                value = LOST
+                for i in beam:
+                    value = max(value, self.GetChildValue(rows, hash, options[i], scores[i], depthLeft - 1))
+
+        self.transpositions[key] = value
+        return value
+
+    def GetChildValue(self, rows, hash, (placement, index, hold), score, depthLeft):
+        """value of playing an option: its lines and the best value after it, or its
+           heuristic score once the known queue runs out"""
+        if index >= len(self.queue) and hold == None:
+            return score
+        rows, hash, linesCleared = LockRows(rows, hash, placement.GetCoordinates())
+        return self.lineValue * linesCleared + self.GetValue(rows, hash, index, hold, depthLeft)
+
+
+
+def GetRootValues((rows, queueIndices, children, depth, beamWidth, weights)):
+    """values of some of the root's options, run in a worker process with its own table
+
+       the queue is passed as indices into TETRAD_CLASSES and each child as
+       (coordinates, next queue index, next hold index, heuristic score)"""
+    queue = [TETRAD_CLASSES[i] for i in queueIndices]
+    search = LookaheadSearch(queue, depth, beamWidth, weights)
+    hash = GetHash(rows)
+    values = list()
+    for coordinates, index, nextHoldIndex, score in children:
+        if index >= len(queue) and nextHoldIndex == None:
+            values.append(score)
+            continue
+        nextHold = None
+        if nextHoldIndex != None:
+            nextHold = TETRAD_CLASSES[nextHoldIndex]
+        childRows, childHash, linesCleared = LockRows(rows, hash, coordinates)
+        values.append(search.lineValue * linesCleared + search.GetValue(childRows, childHash, index, nextHold, depth - 1))
+    return values, search.hits, search.misses
+
+
+
+class LookaheadPlanner:
+    """Chooses the placement with the best value depth tetrads ahead, optionally splitting
+       the root's options across a pool of worker processes."""
+    def __init__(self, depth=3, beamWidth=4, weights=None, noWorkers=1):
+        self.depth = depth
+        self.beamWidth = beamWidth
+        self.weights = weights
+        self.noWorkers = noWorkers
+        self.pool = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def Close(self):
+        if self.pool != None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def GetActions(self, player):
+        """ACTION_* list that plays the best root option, holding first if it swaps"""
+        well = player.well
+        currentTetrad = well.GetCurrentTetrad()
+        queue = [currentTetrad.__class__] + [tetrad.__class__ for tetrad in player.nextTetrads]
+        hold = None
+        if player.holdTetrad != None:
+            hold = player.holdTetrad.__class__
+
+        search = LookaheadSearch(queue, self.depth, self.beamWidth, self.weights)
+        options = search.GetOptions(well.rows, 0, hold, GetTetradPosition(currentTetrad))
+        if not options:
+            return [ACTION_SONIC_DROP]
+        scores, beam = search.GetBeam(well.rows, options)
+
+        if self.depth <= 1:
+            values = [scores[i] for i in beam]
+        elif self.noWorkers > 1:
+            values = self.GetPoolValues(well.rows, queue, options, scores, beam)
+        else:
+            hash = GetHash(well.rows)
+            values = [search.GetChildValue(well.rows, hash, options[i], scores[i], self.depth - 1) for i in beam]
+            self.hits += search.hits
+            self.misses += search.misses
+
+        best = beam[values.index(max(values))]
+        placement, index, nextHold = options[best]
+        actions = list(placement.GetPath()) + [ACTION_SONIC_DROP]
+        if placement.search.tetradClass != queue[0]:
+            actions.insert(0, ACTION_HOLD)
+        return actions
+
+    def GetPoolValues(self, rows, queue, options, scores, beam):
+        """the beam's values with the root options dealt out round robin to the workers"""
+        if self.pool == None:
+            self.pool = multiprocessing.Pool(self.noWorkers)
+
+        indices = [TETRAD_CLASSES.index(tetradClass) for tetradClass in queue]
+        jobs = list()
+        for worker in range(min(self.noWorkers, len(beam))):
+            children = list()
+            for i in beam[worker::self.noWorkers]:
+                placement, index, nextHold = options[i]
+                nextHoldIndex = None
+                if nextHold != None:
+                    nextHoldIndex = TETRAD_CLASSES.index(nextHold)
+                children.append((placement.GetCoordinates(), index, nextHoldIndex, scores[i]))
+            jobs.append((list(rows), indices, children, self.depth, self.beamWidth, self.weights))
+
+        values = [None] * len(beam)
+        for worker, (workerValues, hits, misses) in enumerate(self.pool.map(GetRootValues, jobs, 1)):
+            values[worker::self.noWorkers] = workerValues
+            self.hits += hits
+            self.misses += misses
+        return values
+
+
+
+class LookaheadBot(HeuristicBot):
+    """HeuristicBot that plays the lookahead planner's choices"""
+    def __init__(self, eventManager, player, depth=3, beamWidth=4, weights=None, noWorkers=1):
+        HeuristicBot.__init__(self, eventManager, player, weights)
+        self.planner = LookaheadPlanner(depth, beamWidth, weights, noWorkers)
+
+
+class LookaheadPolicy:
+    """selfplay policy that plays the lookahead planner's choice"""
+    def __init__(self, seed, depth=3, beamWidth=4, weights=None):
+        self.planner = LookaheadPlanner(depth, beamWidth, weights)
+
+    def GetActions(self, engine):
+        return self.planner.GetActions(engine.player)
@@ -0,0 +1,146 @@
+"""Plays headless games across a process pool to measure how fast the engine runs.
+
+   python selfplay.py --games 32 --policy lowest --randomizer bag --seed 1 --max-pieces 500"""
+import os, sys, time, random, argparse, multiprocessing
+from headless import *
+from placements import GetWellPlacements, LockPlacement
+
+
+
+class RandomPolicy:
+    """Moves each tetrad to a random column and rotation then drops it."""
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+
+    def GetActions(self, engine):
+        actions = [ACTION_ROTATE_CW] * self.random.randint(0, 3)
+        actions += [self.random.choice((ACTION_LEFT, ACTION_RIGHT))] * self.random.randint(0, 5)
+        actions.append(ACTION_SONIC_DROP)
+        return actions
+
+
+class LowestPlacementPolicy:
+    """Picks the placement that clears the most lines and then sits lowest in the well."""
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+
+    def GetActions(self, engine):
+        rows = engine.well.rows
+        best = None
+        for placement in GetWellPlacements(engine.well):
+            linesCleared = LockPlacement(rows, placement.GetCoordinates())[1]
+            depth = sum([row for row, column in placement.GetCoordinates()])
+            score = (linesCleared, depth, self.random.random())
+            if best == None or score > best[0]:
+                best = (score, placement)
+        if best == None:
+            return [ACTION_SONIC_DROP]
+        return list(best[1].GetPath()) + [ACTION_SONIC_DROP]
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'lowest': LowestPlacementPolicy}
+
+try:
+    from bot import HeuristicPolicy
+    from search import LookaheadPolicy
+    POLICIES['heuristic'] = HeuristicPolicy
+    POLICIES['lookahead'] = LookaheadPolicy
+except ImportError:
+    pass    # the heuristic bot needs numpy
+
+
+
+def PlayGame((seed, policyName, randomizerMode, maxPieces)):
+    """plays one game to a top out or maxPieces, a game is fully determined by its seed"""
+    engine = HeadlessEngine(randomizer=GetRandomizer(randomizerMode, seed))
+    policy = POLICIES[policyName](seed)
+
+    startTime = time.time()
+    engine.Start()
+    while not engine.IsGameOver() and engine.piecesLocked < maxPieces:
+        for action in policy.GetActions(engine):
+            engine.Perform(action)
+        engine.RunUntilLocked()
+    seconds = time.time() - startTime
+
+    return {
+        'seed': seed,
+        'worker': os.getpid(),
+        'pieces': engine.piecesLocked,
+        'ticks': engine.ticks,
+        'lines': engine.GetLines(),
+        'gameOver': engine.IsGameOver(),
+        'seconds': seconds}
+
+
+def Run(noGames, policyName='lowest', randomizerMode='random', seed=0, maxPieces=500, noWorkers=None):
+    """plays noGames games with seeds seed, seed + 1, ... and returns each game's result"""
+    jobs = [(seed + i, policyName, randomizerMode, maxPieces) for i in range(noGames)]
+    if noWorkers == 1:
+        return map(PlayGame, jobs)
+
+    pool = multiprocessing.Pool(noWorkers)
+    try:
+        results = pool.map(PlayGame, jobs, 1)
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def Summarise(results, seconds):
+    """aggregate and per worker throughput, rates use wall clock time across the whole pool"""
+    summary = {
+        'games': len(results),
+        'seconds': seconds,
+        'pieces': sum([result['pieces'] for result in results]),
+        'ticks': sum([result['ticks'] for result in results]),
+        'lines': sum([result['lines'] for result in results]),
+        'workers': dict()}
+    summary['piecesPerSecond'] = summary['pieces'] / seconds
+    summary['ticksPerSecond'] = summary['ticks'] / seconds
+
+    for result in results:
+        worker = summary['workers'].setdefault(result['worker'], {'games': 0, 'pieces': 0, 'ticks': 0, 'seconds': 0.0})
+        worker['games'] += 1
+        worker['pieces'] += result['pieces']
+        worker['ticks'] += result['ticks']
+        worker['seconds'] += result['seconds']
+    for worker in summary['workers'].values():
+        worker['piecesPerSecond'] = worker['pieces'] / max(worker['seconds'], 1e-9)
+        worker['ticksPerSecond'] = worker['ticks'] / max(worker['seconds'], 1e-9)
+    return summary
+
+
+def PrintSummary(summary):
+    print '%d games in %.2fs' % (summary['games'], summary['seconds'])
+    print '  pieces: %d (%.1f/s)' % (summary['pieces'], summary['piecesPerSecond'])
+    print '  ticks:  %d (%.1f/s)' % (summary['ticks'], summary['ticksPerSecond'])
+    print '  lines:  %d' % summary['lines']
+    for pid in sorted(summary['workers'].keys()):
+        worker = summary['workers'][pid]
+        print '  worker %d: %d games, %.1f pieces/s, %.1f ticks/s' % (
+            pid, worker['games'], worker['piecesPerSecond'], worker['ticksPerSecond'])
+
+
+
+def main(arguments):
+    parser = argparse.ArgumentParser(description="Headless self-play throughput benchmark")
+    parser.add_argument('--games', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--workers', type=int, default=None, help="processes to use, defaults to one per core")
+    parser.add_argument('--policy', choices=sorted(POLICIES.keys()), default='lowest')
+    parser.add_argument('--randomizer', choices=sorted(RANDOMIZERS.keys()), default='random')
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game, later games count up from it")
+    parser.add_argument('--max-pieces', type=int, default=500)
+    options = parser.parse_args(arguments)
+
+    startTime = time.time()
+    results = Run(options.games, options.policy, options.randomizer, options.seed, options.max_pieces, options.workers)
+    PrintSummary(Summarise(results, time.time() - startTime))
+
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+import unittest, random
+from headless import *
+from batchsim import BatchSimulator, NO_HOLD
+
+
+class MirrorRandomizer(Randomizer):
+    """deals a HeadlessEngine the tetrads a simulator dealt one of its boards: the current and
+       preview tetrads it started with, then whichever joined the back of its queue last"""
+    def __init__(self, simulator, board):
+        Randomizer.__init__(self)
+        self.simulator = simulator
+        self.board = board
+        self.initialTetrads = [simulator.tetrads[board]] + list(simulator.nextTetrads[board])
+
+    def GetNext(self):
+        self.noDealt += 1
+        if self.initialTetrads:
+            return int(self.initialTetrads.pop(0))
+        return int(self.simulator.nextTetrads[self.board, -1])
+
+
+
+class BatchSimulatorTest(unittest.TestCase):
+    NO_BOARDS = 16
+    NO_STEPS = 3000
+
+    def assertBoardMatches(self, simulator, board, engine):
+        self.assertEqual(simulator.gameOver[board], engine.IsGameOver())
+        if engine.IsGameOver():
+            return
+        well = engine.well
+        tetrad = well.GetCurrentTetrad()
+        self.assertEqual(list(simulator.rows[board]), list(well.rows))
+        self.assertEqual(TETRAD_CLASSES[simulator.tetrads[board]], tetrad.__class__)
+        self.assertEqual(sorted([tuple(coordinate) for coordinate in simulator.GetCurrentCoordinates([board])[0]]),
+                         sorted(tetrad.GetCoordinates()))
+        self.assertEqual(simulator.states[board], tetrad.GetState())
+        self.assertEqual((simulator.dropTimers[board], simulator.lockTimers[board]), (well.dropTimer, well.lockTimer))
+        self.assertEqual([TETRAD_CLASSES[i] for i in simulator.nextTetrads[board]],
+                         [next.__class__ for next in engine.player.nextTetrads])
+        holdTetrad = None
+        if simulator.holdTetrads[board] != NO_HOLD:
+            holdTetrad = TETRAD_CLASSES[simulator.holdTetrads[board]]
+        self.assertEqual(holdTetrad, engine.player.holdTetrad and engine.player.holdTetrad.__class__)
+        self.assertEqual((simulator.lines[board], simulator.piecesLocked[board]), (engine.GetLines(), engine.piecesLocked))
+
+    def testStepMatchesHeadlessEngine(self):
+        simulator = BatchSimulator(BatchSimulatorTest.NO_BOARDS, seed=15)
+        engines = list()
+        for board in range(BatchSimulatorTest.NO_BOARDS):
+            engine = HeadlessEngine(randomizer=MirrorRandomizer(simulator, board))
+            engine.Start()
+            engines.append(engine)
+
+        # mostly waiting and moving down, so tetrads land and lines fill now and then
+        rng = random.Random(15)
+        choices = [ACTION_NONE] * 6 + range(ACTION_NONE) + [ACTION_DOWN] * 2
+        for step in range(BatchSimulatorTest.NO_STEPS):
+            actions = [rng.choice(choices) for board in range(BatchSimulatorTest.NO_BOARDS)]
+            simulator.Step(actions)
+            for board in range(BatchSimulatorTest.NO_BOARDS):
+                engine = engines[board]
+                if engine.IsGameOver():
+                    continue
+                if actions[board] != ACTION_NONE:
+                    engine.Perform(actions[board])
+                engine.Tick()
+                self.assertBoardMatches(simulator, board, engine)
+
+        self.assertTrue(simulator.piecesLocked.sum() > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest, random
+import numpy
+from headless import *
+from placements import GetWellPlacements, LockPlacement
+from search import GetHash, LockRows
+from bot import LockBoards
+
+
+WELL_ACTIONS = (
+    lambda well: well.MoveCurrentTetrad(DIRECTION_LEFT),
+    lambda well: well.MoveCurrentTetrad(DIRECTION_RIGHT),
+    lambda well: well.MoveCurrentTetrad(DIRECTION_DOWN),
+    lambda well: well.RotateCurrentTetrad(DIRECTION_CW),
+    lambda well: well.RotateCurrentTetrad(DIRECTION_CCW))
+
+
+def GetReachableLocks(well):
+    """coordinates of every position the current tetrad can lock in, found by breadth first
+       search over the well's own moves and rotations"""
+    snapshot = well.Snapshot()
+    tetradClass, coordinates, rotationState, state = snapshot.currentTetrad
+    start = (rotationState, coordinates)
+    seen = set([start])
+    queue = [start]
+    locks = set()
+
+    while queue:
+        position = queue.pop(0)
+        for action in WELL_ACTIONS:
+            well.Restore(snapshot._replace(currentTetrad=(tetradClass, position[1], position[0], Tetrad.STATE_ACTIVE)))
+            moved = action(well)
+            if action == WELL_ACTIONS[2] and not moved:
+                locks.add(frozenset(position[1]))
+            if moved:
+                nextPosition = (well.GetCurrentTetrad().GetRotationState(), tuple(well.GetCurrentTetrad().GetCoordinates()))
+                if nextPosition not in seen:
+                    seen.add(nextPosition)
+                    queue.append(nextPosition)
+
+    well.Restore(snapshot)
+    well.eventManager.eventQueue = []
+    return locks
+
+
+def PlayGames(test, noGames, noPieces, check):
+    """play random low placements, calling check(engine, placements) before each piece"""
+    rng = random.Random(11)
+    for game in range(noGames):
+        engine = HeadlessEngine(randomizer=PureRandomizer(game))
+        engine.Start()
+        while engine.piecesLocked < noPieces and not engine.IsGameOver():
+            placements = GetWellPlacements(engine.well)
+            check(engine, placements)
+
+            placement = max(placements, key=lambda placement: (max([row for row, column in placement.GetCoordinates()]), rng.random()))
+            for action in placement.GetPath():
+                engine.Perform(action)
+            test.assertEqual(sorted(engine.well.GetCurrentTetrad().GetCoordinates()), sorted(placement.GetCoordinates()))
+            engine.RunUntilLocked()
+
+
+
+class PlacementsTest(unittest.TestCase):
+    def testPlacementsMatchBreadthFirstSearch(self):
+        def Check(engine, placements):
+            self.assertEqual(set([frozenset(placement.GetCoordinates()) for placement in placements]),
+                             GetReachableLocks(engine.well))
+        PlayGames(self, 2, 25, Check)
+
+
+class LockTest(unittest.TestCase):
+    def testLocksMatchWell(self):
+        """LockPlacement, LockRows and LockBoards leave the rows Well.LockCurrentTetrad does"""
+        def Check(engine, placements):
+            rows = list(engine.well.rows)
+            snapshot = engine.Snapshot()
+            coordinates = numpy.array([placement.GetCoordinates() for placement in placements], dtype=numpy.int32)
+            boards, boardLines = LockBoards(rows, coordinates)
+
+            for i in range(len(placements)):
+                for action in placements[i].GetPath():
+                    engine.Perform(action)
+                engine.SonicDrop()
+                lines = engine.GetLines()
+                engine.well.LockCurrentTetrad()
+                wellRows = list(engine.well.rows)
+                lines = engine.GetLines() - lines
+                engine.eventManager.ConsumeEventQueue()
+                engine.Restore(snapshot)
+
+                self.assertEqual(LockPlacement(rows, placements[i].GetCoordinates()), (wellRows, lines))
+                lockedRows, hash, linesCleared = LockRows(rows, GetHash(rows), placements[i].GetCoordinates())
+                self.assertEqual((lockedRows, linesCleared), (wellRows, lines))
+                self.assertEqual(hash, GetHash(wellRows))
+                self.assertEqual((list(boards[i]), boardLines[i]), (wellRows, lines))
+        PlayGames(self, 2, 40, Check)
+
+
+if __name__ == '__main__':
+    unittest.main()
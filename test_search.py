@@ -0,0 +1,44 @@
+import unittest, random
+from search import *
+from placements import GetPlacements
+
+
+class LockRowsTest(unittest.TestCase):
+    def assertHashMatches(self, rows, coordinates):
+        newRows, hash, linesCleared = LockRows(rows, GetHash(rows), coordinates)
+        self.assertEqual(hash, GetHash(newRows))
+        return linesCleared
+
+    def testLockIntoRowZeroClearingLines(self):
+        # a vertical I tetrad reaching row 0, completing row 3
+        rows = [0] * Well.WELL_ROWS
+        rows[3] = Well.FULL_ROW & ~(1 << 9)
+        for row in range(4, Well.WELL_ROWS):
+            rows[row] = Well.FULL_ROW & ~(1 << (row % 9))
+        self.assertEqual(self.assertHashMatches(rows, [(0, 9), (1, 9), (2, 9), (3, 9)]), 1)
+
+    def testRandomWells(self):
+        rng = random.Random(14)
+        linesCleared = 0
+        for well in range(300):
+            # stacks up to the top row, every row holed so none starts full
+            rows = [0] * Well.WELL_ROWS
+            for row in range(rng.randrange(Well.WELL_ROWS), Well.WELL_ROWS):
+                rows[row] = rng.randrange(Well.FULL_ROW) & ~(1 << rng.randrange(Well.WELL_COLUMNS))
+            for placement in GetPlacements(rows, rng.choice(TETRAD_CLASSES)):
+                linesCleared += self.assertHashMatches(rows, placement.GetCoordinates())
+
+            # and every empty spot touching row 0, reachable or not
+            for tetradClass in TETRAD_CLASSES:
+                for rotation in tetradClass.ROTATION_STATES:
+                    rowOffset = -min([row for row, column in rotation])
+                    for columnOffset in range(-Well.WELL_COLUMNS, Well.WELL_COLUMNS):
+                        coordinates = [(row + rowOffset, column + columnOffset) for row, column in rotation]
+                        if all([0 <= column < Well.WELL_COLUMNS and not rows[row] & (1 << column)
+                                for row, column in coordinates]):
+                            linesCleared += self.assertHashMatches(rows, coordinates)
+        self.assertTrue(linesCleared > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
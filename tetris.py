@@ -1,6 +1,7 @@
-import os, pygame, sys, math, random
+import os, pygame, sys, math, random, time
 from pygame.locals import *
 from events import *
+from model import *
 from utilities import Utilities, Callable
 
 if not pygame.font: print 'Warning, fonts disabled'
@@ -9,7 +10,9 @@ if not pygame.mixer: print 'Warning, sound disabled'
 
 TITLE_CAPTION = "Super Tetra Master"
 SCREEN_RESOLUTION = (640,480)
-FRAMES_PER_SECOND = 60
+FRAMES_PER_SECOND = 60     # most frames drawn a second
+TICKS_PER_SECOND = 60       # simulation steps a second, the well's timers count these
+MAX_CATCH_UP_TICKS = 5      # most ticks run before a frame, past this the game slows down
 
 
 
@@ -18,138 +21,182 @@ NEXT_ORIGINS = ((292, 20), (362, 40), (400, 40))
 WELL_ORIGIN = (240,48) #pixels
 TILE_SIZE = (16,16) #pixels
 SMALL_TILE_SIZE = (8, 8)
+BLOCK_SIZE = (15, 15) #pixels, a tile less the gap between blocks
+SMALL_BLOCK_SIZE = (7, 7)
+
+DIRECTION_KEYS = {K_LEFT: DIRECTION_LEFT, K_RIGHT: DIRECTION_RIGHT, K_DOWN: DIRECTION_DOWN}
 
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-RED = (255, 0, 0)
-GREEN = (0, 255, 0)
-BLUE = (0, 0, 255)
-YELLOW = (255, 255, 0)
-CYAN = (0, 255, 255)
-MAGENTA = (255, 0, 255)
-ORANGE = (255, 153, 51)
-GREY = (100, 100, 100)
-
-
-DIRECTION_UP = 0
-DIRECTION_DOWN = 1
-DIRECTION_LEFT = 2
-DIRECTION_RIGHT = 3
-DIRECTION_CW = 4
-DIRECTION_CCW = 5
-
-
-
-class EventManager:
-    """class that coordinates communication between the model and the view and controller"""
-    def __init__(self):
-        from weakref import WeakKeyDictionary
-        self.listeners = WeakKeyDictionary()
-        self.eventQueue = []
-
-    def RegisterListener(self, listener):
-        self.listeners[listener] = 1
-
-    def UnregisterListener(self, listener):
-        if listener in self.listeners:
-            del self.listeners[listener]
-
-    def Post(self, event):
-        """post a new event, broadcast to all listeners"""
-        self.eventQueue.append(event)
-        if isinstance(event, TickEvent):
-            self.ConsumeEventQueue()
-        
-    def ConsumeEventQueue(self):
-        i = 0;
-        while i < len(self.eventQueue):
-            event = self.eventQueue[i]
-            for listener in self.listeners:
-                listener.Notify(event)
-            i += 1
 
-        # all events handled, clear queue
-        self.eventQueue = []
 
 
 class KeyboardController:
     def __init__(self, eventManager):
         self.eventManager = eventManager
-        self.eventManager.RegisterListener(self)
+        self.eventManager.RegisterListener(self, {
+            TickEvent: self.OnTick,
+            WakeEvent: self.OnWake,
+            GameStartedEvent: self.OnGameStarted,
+            GamePausedEvent: self.OnGamePaused,
+            GameResumedEvent: self.OnGameResumed})
 
         #pygame.event.set_allowed([KEYDOWN])
-        pygame.key.set_repeat(250, 20)
+        pygame.key.set_repeat()     # held directions are repeated by the model's AutoShifter
+        self.playing = False    # tetrad requests are only posted while the game runs
+
+    def HandleInput(self, event):
+        if event.type == QUIT:
+            self.eventManager.Post(QuitEvent())
+
+        elif event.type == KEYDOWN and event.key == K_ESCAPE:
+            self.eventManager.Post(QuitEvent())
+
+        elif event.type == KEYDOWN and event.key == K_RETURN:
+            print 'start game'
+            self.eventManager.Post(GameStartRequest())
+
+        elif event.type == KEYDOWN and event.key == K_p:
+            self.eventManager.Post(GamePauseRequest())
 
-    def Notify(self, event):
-        if isinstance(event, TickEvent):
-            #Handle Input
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    self.eventManager.Post(QuitEvent())
+        elif event.type == KEYUP and event.key in DIRECTION_KEYS:
+            self.eventManager.Post(DirectionReleasedEvent(DIRECTION_KEYS[event.key], time.time()))
 
-                elif event.type == KEYDOWN and event.key == K_ESCAPE:
-                    self.eventManager.Post(QuitEvent())
+        elif not self.playing:
+            return
 
-                elif event.type == KEYDOWN and event.key == K_1:
-                    self.eventManager.Post(TetradRotateRequest(DIRECTION_CCW))
+        elif event.type == KEYDOWN and event.key == K_1:
+            self.eventManager.Post(TetradRotateRequest(DIRECTION_CCW))
 
-                elif event.type == KEYDOWN and event.key == K_2:
-                    self.eventManager.Post(TetradRotateRequest(DIRECTION_CW))
+        elif event.type == KEYDOWN and event.key == K_2:
+            self.eventManager.Post(TetradRotateRequest(DIRECTION_CW))
 
-                elif event.type == KEYDOWN and event.key == K_BACKQUOTE:
-                    self.eventManager.Post(TetradSwapRequest())
- 
-                elif event.type == KEYDOWN and event.key == K_DOWN:
-                    self.eventManager.Post(TetradMoveRequest(DIRECTION_DOWN))
- 
-                elif event.type == KEYDOWN and event.key == K_UP:
-                    self.eventManager.Post(SonicDropRequest())
+        elif event.type == KEYDOWN and event.key == K_BACKQUOTE:
+            self.eventManager.Post(TetradSwapRequest())
 
-                elif event.type == KEYDOWN and event.key == K_LEFT:
-                    self.eventManager.Post(TetradMoveRequest(DIRECTION_LEFT))
+        elif event.type == KEYDOWN and event.key in DIRECTION_KEYS:
+            # stamped as the event is read, pygame events carry no time of their own
+            self.eventManager.Post(DirectionPressedEvent(DIRECTION_KEYS[event.key], time.time()))
 
-                elif event.type == KEYDOWN and event.key == K_RIGHT:
-                    self.eventManager.Post(TetradMoveRequest(DIRECTION_RIGHT))
+        elif event.type == KEYDOWN and event.key == K_UP:
+            self.eventManager.Post(SonicDropRequest())
 
-                elif event.type == KEYDOWN and event.key == K_RETURN:
-                    print 'start game'
-                    self.eventManager.Post(GameStartRequest())
+    def OnTick(self, event):
+        #Handle Input
+        for event in pygame.event.get():
+            self.HandleInput(event)
+
+    def OnWake(self, event):
+        self.HandleInput(event.inputEvent)
+        self.OnTick(event)
+
+    def OnGameStarted(self, event):
+        self.playing = True
+
+    def OnGamePaused(self, event):
+        self.playing = False
+
+    def OnGameResumed(self, event):
+        self.playing = True
 
 
 class CPUSpinnerController:
     def __init__(self, eventManager):
         self.eventManager = eventManager
-        self.eventManager.RegisterListener(self)
+        self.eventManager.RegisterListener(self, {
+            QuitEvent: self.OnQuit,
+            GameStartedEvent: self.OnGameResumed,
+            GamePausedEvent: self.OnGamePaused,
+            GameResumedEvent: self.OnGameResumed})
         self.keepGoing = True
         self.clock = pygame.time.Clock()
-        self.running = True
+        self.running = False    # ticking, otherwise idle until there is input
 
     def Run(self):
+        """tick the model at a fixed TICKS_PER_SECOND whatever the frame rate, catching up at
+           most MAX_CATCH_UP_TICKS ticks before each frame, and block on input while idle"""
+        tickLength = 1.0 / TICKS_PER_SECOND
+        lastTime = time.time()
+        lag = 0.0
+
         while self.keepGoing:
+            if not self.running:
+                self.Idle()
+                # time spent idle is not owed to the model
+                lastTime = time.time()
+                lag = 0.0
+                continue
+
             self.clock.tick(FRAMES_PER_SECOND)
-            if self.running:
-                self.eventManager.Post(TickEvent())
+            now = time.time()
+            lag += now - lastTime
+            lastTime = now
+
+            noTicks = 0
+            tickStart = time.time()
+            while lag >= tickLength and noTicks < MAX_CATCH_UP_TICKS and self.keepGoing:
+                lag -= tickLength
+                if self.running:
+                    self.eventManager.Post(TickEvent(now - lag))
+                noTicks += 1
+
+            # too far behind to catch up, drop the rest rather than fall further behind
+            if lag >= tickLength:
+                lag = 0.0
+
+            self.eventManager.Post(FrameEvent(lag / tickLength, noTicks, time.time() - tickStart))
+
+    def Idle(self):
+        """sleep until pygame has an event, then let the listeners handle it and redraw"""
+        self.eventManager.Post(WakeEvent(pygame.event.wait()))
+        self.eventManager.Post(FrameEvent())
+
+    def OnQuit(self, event):
+        self.keepGoing = False
+
+    def OnGamePaused(self, event):
+        self.running = False
+
+    def OnGameResumed(self, event):
+        self.running = True
 
-    def Notify(self, event):
-        if isinstance(event, QuitEvent):
-            self.keepGoing = False
 
 
 
 
+class BlockSurfaceAtlas:
+    """pre-rendered block surfaces, one per colour and size, shared by all the block sprites"""
+    def __init__(self, colours):
+        self.surfaces = dict()
+        for colour in colours:
+            for size in (BLOCK_SIZE, SMALL_BLOCK_SIZE):
+                self.RenderSurface(colour, size)
+
+    def RenderSurface(self, colour, size):
+        surf = pygame.Surface(size)
+        surf.fill(colour)
+        self.surfaces[(colour, size)] = surf
+        return surf
+
+    def GetSurface(self, colour, size=BLOCK_SIZE):
+        surf = self.surfaces.get((colour, size))
+        if surf == None:
+            surf = self.RenderSurface(colour, size)
+        return surf
+
 
 class BlockSprite(pygame.sprite.Sprite):
     """..."""
-    def __init__(self, block, colour, group=None):
+    def __init__(self, block, colour, atlas, group=None):
         pygame.sprite.Sprite.__init__(self, group)
 
-        surf = pygame.Surface((15,15))
-        surf.fill(colour)
+        self.atlas = atlas
+        self.block = block
+        self.Reset(colour)
 
-        self.image = surf
-        self.rect  = surf.get_rect()
+    def Reset(self, colour):
+        self.colour = colour
 
-        self.block = block
+        self.image = self.atlas.GetSurface(colour)
+        self.rect  = self.image.get_rect()
 
         self.moveTo = None
         self.shrink = False
@@ -170,20 +217,32 @@ class BlockSprite(pygame.sprite.Sprite):
             self.rect.center = self.moveTo
             self.moveTo = None
         if self.shrink == True:
-            surf = pygame.transform.scale(self.image, (7,7))
-            self.image = surf
+            self.image = self.atlas.GetSurface(self.colour, SMALL_BLOCK_SIZE)
             self.shrink = False
         if self.grow == True:
-            surf = pygame.transform.scale(self.image, (15,15))
-            self.image = surf
+            self.image = self.atlas.GetSurface(self.colour, BLOCK_SIZE)
             self.grow = False
 
 
 class PygameView:
 
-    def __init__(self, eventManager):
+    def __init__(self, eventManager, diagnostics=None):
         self.eventManager = eventManager
-        self.eventManager.RegisterListener(self)
+        self.eventManager.RegisterListener(self, {
+            QuitEvent: self.OnQuit,
+            FrameEvent: self.OnFrame,
+            TetradsCreatedEvent: self.OnTetradsCreated,
+            TetradAddedEvent: self.OnTetradAdded,
+            TetradMovedEvent: self.OnTetradMoved,
+            SonicDropEvent: self.OnTetradMoved,
+            TetradRotatedEvent: self.OnTetradMoved,
+            TetradDroppedEvent: self.OnTetradMoved,
+            GhostAddedEvent: self.OnGhostAdded,
+            GhostUpdatedEvent: self.OnGhostUpdated,
+            TetradHeldEvent: self.OnTetradHeld,
+            TetradSwappedEvent: self.OnTetradSwapped,
+            StackUpdateEvent: self.OnStackUpdate,
+            GarbageInsertedEvent: self.OnGarbageInserted})
 
         self.window = pygame.display.set_mode(SCREEN_RESOLUTION)
         pygame.display.set_caption(TITLE_CAPTION)
@@ -202,6 +261,15 @@ class PygameView:
 
         self.backSprites = pygame.sprite.RenderUpdates()
         self.frontSprites = pygame.sprite.RenderUpdates()
+        self.blockSprites = dict()  # block -> the sprite drawing it
+        self.freeSprites = dict()   # cleared block -> its sprite, reused when the block is recycled
+        self.spriteHits = 0
+        self.spriteMisses = 0
+        self.changed = False        # a model event arrived since the last frame was drawn
+        self.diagnostics = diagnostics  # a diagnostics.FrameDiagnostics timing each frame, or None
+
+        # tetrad colours, ghost tetrads are grey
+        self.atlas = BlockSurfaceAtlas((YELLOW, RED, CYAN, ORANGE, BLUE, GREEN, MAGENTA, GREY))
         
         
     def AddTetrads(self, tetrads):
@@ -214,7 +282,7 @@ class PygameView:
             colour = tetrad.GetColour()
             origin = NEXT_ORIGINS[tetrads.index(tetrad)]
             for block in tetrad.blocks:
-                blockSprite = BlockSprite(block, colour, self.frontSprites)
+                blockSprite = self.CreateBlockSprite(block, colour, self.frontSprites)
                 row, column = tetrad.GetPreviewBlockCoordinates(tetrad.blocks.index(block))
                 if tetrads.index(tetrad) == 0:
                     moveRect = pygame.Rect((origin[0] + column * TILE_SIZE[0], origin[1] + row * TILE_SIZE[1]), TILE_SIZE)
@@ -257,7 +325,7 @@ class PygameView:
             else:
                 for block in tetrad.blocks:
                     colour = tetrad.GetColour()
-                    blockSprite = BlockSprite(block, colour, self.frontSprites)
+                    blockSprite = self.CreateBlockSprite(block, colour, self.frontSprites)
                     row, column = tetrad.GetPreviewBlockCoordinates(tetrad.blocks.index(block))
                     moveRect = pygame.Rect((origin[0] + column * SMALL_TILE_SIZE[0], origin[1] + row * SMALL_TILE_SIZE[1]), SMALL_TILE_SIZE)
                     blockSprite.MoveTo(moveRect.center)
@@ -294,7 +362,7 @@ class PygameView:
     def AddGhost(self, tetrad):
         colour = tetrad.GetColour()
         for block in tetrad.blocks:
-            blockSprite = BlockSprite(block, colour, self.backSprites)
+            blockSprite = self.CreateBlockSprite(block, colour, self.backSprites)
             #row, column = block.GetCoordinates()
             #moveRect = pygame.Rect((WELL_ORIGIN[0] + column * TILE_SIZE[0], WELL_ORIGIN[1] + row * TILE_SIZE[1]), TILE_SIZE)
             #blockSprite.MoveTo(moveRect.center)
@@ -307,1178 +375,133 @@ class PygameView:
             blockSprite.MoveTo(moveRect.center)
 
 
-    def GetBlockSprite(self, block):
-        for s in self.frontSprites:
-            if hasattr(s, "block") and s.block == block:
-                return s
-        for s in self.backSprites:
-            if hasattr(s, "block") and s.block == block:
-                return s
-        
-
-    def Notify(self, event):
-        if isinstance(event, TickEvent):
-            #Draw everything
-            self.backSprites.clear(self.window, self.background)
-            self.frontSprites.clear(self.window, self.background)
-            
-            self.backSprites.update()
-            self.frontSprites.update()
-
-            dirtyRects1 = self.backSprites.draw(self.window)
-            dirtyRects2 = self.frontSprites.draw(self.window)
-            
-            dirtyRects = dirtyRects1 + dirtyRects2
-            pygame.display.update( dirtyRects )
-
-
-        elif isinstance(event, TetradsCreatedEvent):
-            self.AddTetrads(event.tetrads)
-
-        elif isinstance(event, TetradAddedEvent):
-            self.AddTetrad(event.currentTetrad, event.nextTetrads)
-
-        elif isinstance(event, TetradMovedEvent):
-            self.MoveTetrad(event.tetrad)
-            
-        elif isinstance(event, SonicDropEvent):
-            self.MoveTetrad(event.tetrad)
-
-        elif isinstance(event, TetradRotatedEvent):
-            self.MoveTetrad(event.tetrad)
-
-        elif isinstance(event, TetradDroppedEvent):
-            self.MoveTetrad(event.tetrad)
-
-        elif isinstance(event, GhostAddedEvent):
-            self.AddGhost(event.tetrad)
-            
-        elif isinstance(event, GhostUpdatedEvent):
-            self.UpdateGhost(event.tetrad)
-
-        elif isinstance(event, TetradHeldEvent):
-            self.HoldTetrad(event.tetrad)
-            
-        elif isinstance(event, TetradSwappedEvent):
-            self.GrowTetrad(event.currentTetrad)
-            self.MoveTetrad(event.currentTetrad)
-            self.HoldTetrad(event.holdTetrad)
-            
-
-        elif isinstance(event, StackUpdateEvent):
-            for block in event.clearedBlocks:
-                blockSprite = self.GetBlockSprite(block)
-                self.frontSprites.remove(blockSprite)
-
-            for block in event.movedBlocks:
-                self.MoveBlock(block)
-
-
-
-class Game:
-    """..."""
-
-    STATE_PREPARING = 0
-    STATE_RUNNING = 1
-    STATE_PAUSED = 2
-
-    def __init__(self, eventManager):
-        self.eventManager = eventManager
-        self.eventManager.RegisterListener(self)
-
-        self.state = Game.STATE_PREPARING
-
-        #create the players (one player for now)
-        self.players = [Player(eventManager)]
-
-    def Start(self):
-        for player in self.players:
-            player.Start()
-
-        self.state = Game.STATE_RUNNING
-
-        print "game started"
-        self.eventManager.Post(GameStartedEvent(self))
-
-    def Notify(self, event):
-        if isinstance(event, GameStartRequest):
-            if self.state == Game.STATE_PREPARING:
-                self.Start()
-
-
-
-class Player:
-
-    
-    NO_NEXT_TETRADS = 3
-    
-    """Model of the player that has a current and next tetrad"""
-    def __init__(self, eventManager):
-        self.eventManager = eventManager
-        self.eventManager.RegisterListener(self)
-
-        #player needs a well to put the tetrads on
-        self.well = Well(eventManager)
-
-        #player's tetrads
-        self.nextTetrads = range(Player.NO_NEXT_TETRADS)   
-        self.holdTetrad = None
-
-
-    def Start(self):        
-        #create starting tetrads
-        for i in range(Player.NO_NEXT_TETRADS):
-            self.nextTetrads[i] = Tetrad.GetRandomTetrad(self.eventManager)
-        self.eventManager.Post(TetradsCreatedEvent(self.nextTetrads))
-
-        #build well
-        self.well.Build()
-
-
-    def AddTetrad(self):
-        currentTetrad = self.nextTetrads.pop(0)
-        self.well.AddTetrad(currentTetrad)
-        self.nextTetrads.append(Tetrad.GetRandomTetrad(self.eventManager))
-
-        self.eventManager.Post(TetradAddedEvent(currentTetrad, self.nextTetrads))
-
-
-    def SwapTetrad(self):
-        if self.holdTetrad == None:
-             self.holdTetrad = self.well.GetCurrentTetrad()
-             self.holdTetrad.ClearBlocksSquares()
-             self.holdTetrad.ResetRotationState()
-             self.holdTetrad.SetState(Tetrad.STATE_INACTIVE)
-             self.AddTetrad()
-             self.eventManager.Post(TetradHeldEvent(self.holdTetrad))
-
+    def CreateBlockSprite(self, block, colour, group):
+        blockSprite = self.freeSprites.pop(block, None)
+        if blockSprite != None:
+            self.spriteHits += 1
+            blockSprite.Reset(colour)
+            group.add(blockSprite)
         else:
-            currentTetrad = self.holdTetrad
-            self.holdTetrad = self.well.GetCurrentTetrad()
-            self.holdTetrad.ClearBlocksSquares()
-            self.holdTetrad.ResetRotationState()
-            self.holdTetrad.SetState(Tetrad.STATE_INACTIVE)
-            self.well.AddTetrad(currentTetrad)
-            self.eventManager.Post(TetradSwappedEvent(currentTetrad, self.holdTetrad))
-
+            self.spriteMisses += 1
+            blockSprite = BlockSprite(block, colour, self.atlas, group)
+        self.blockSprites[block] = blockSprite
+        return blockSprite
+
+    def RemoveBlockSprite(self, block):
+        blockSprite = self.blockSprites.pop(block, None)
+        if blockSprite != None:
+            blockSprite.kill()
+            # garbage blocks are never reused, only tetrad blocks come back
+            if block.tetrad != None:
+                self.freeSprites[block] = blockSprite
+
+    def GetSpritePoolStats(self):
+        total = self.spriteHits + self.spriteMisses
+        hitRate = 0.0
+        if total > 0:
+            hitRate = float(self.spriteHits) / total
+        return {'hits': self.spriteHits, 'misses': self.spriteMisses, 'hitRate': hitRate,
+                'free': len(self.freeSprites)}
 
-    def Notify(self, event):
-        if isinstance(event, GameStartedEvent):
-            self.AddTetrad()
-
-        elif isinstance(event, TetradLockedEvent):
-            self.AddTetrad()
-
-        elif isinstance(event, TetradSwapRequest):
-            if self.well.GetCurrentTetrad().GetState() != Tetrad.STATE_LOCKED:
-                self.SwapTetrad()
- 
-
-        
-
-class Well:
-    """Model for the well in which tetrads fall into place."""
-
-    WELL_ROWS = 22     # two rows at top are padding for rotations
-    WELL_COLUMNS = 10
-
-    STATE_PREPARING = 0
-    STATE_BUILT = 1
-    
-    LEVELS_FOR_LINES = (1, 2, 4, 6)
-
-    def __init__(self, eventManager):
-        self.eventManager = eventManager
-        self.eventManager.RegisterListener(self)
-
-        self.state = Well.STATE_PREPARING
-        self.squares = range(Well.WELL_ROWS * Well.WELL_COLUMNS)
-        self.stackedBlocks = dict()
-        self.currentTetrad = None
-        self.ghostTetrad = None
-
-        self.dropTimer = 20
-        self.lockTimer = 10
-        
-        self.lines = 0
-        self.gravity = 0
-
-
-    def Build(self):
-        #create all the squares, give them row/column coordinates
-        for row in range(Well.WELL_ROWS):
-            for column in range(Well.WELL_COLUMNS):
-                    self.squares[row*Well.WELL_COLUMNS + column] = Square(self.eventManager, row, column)
-
-        #create a dictionary that keeps rows of dropped blocks for easy line detection
-        for row in range(Well.WELL_ROWS):
-            self.stackedBlocks[row] = list()
-
-        self.ghostTetrad = GhostTetrad(self.eventManager)
-        self.eventManager.Post(GhostAddedEvent(self.ghostTetrad))
-
-        self.state = Well.STATE_BUILT
-        self.eventManager.Post(WellBuiltEvent(self))
-
-
-    def GetCurrentTetrad(self):
-        return self.currentTetrad
-
-    def AddTetrad(self, currentTetrad):
-        self.currentTetrad = currentTetrad
-        square = None
-        row, column = (-1, -1)
-
-        #give current tetrad blocks their initial squares
-        for i in range(4):
-            row, column = self.currentTetrad.GetInitialBlockCoordinates(i)
-            square = self.GetSquare((row, column))
-            self.currentTetrad.SetBlockSquare(i, square)
-        currentTetrad.SetState(Tetrad.STATE_ACTIVE)
-
-        self.UpdateGhostTetrad()
-
-    def UpdateGhostTetrad(self):
-        rowsDown = 1
-        squares = range(4)
-        canDrop = True
-
-        # initially ghost is in the same location has current
-        for i in range(4):
-            self.ghostTetrad.SetBlockSquare(i, self.currentTetrad.GetBlockSquare(i))
-
-        while canDrop:
-            for block in self.currentTetrad.blocks:
-                row, column = block.GetCoordinates()
-                row += rowsDown
-                if row >= Well.WELL_ROWS:
-                    canDrop = False
-                    break
-                elif self.GetSquare((row, column)).IsFilled():
-                    canDrop = False
-                    break
-                else:
-                    squares[self.currentTetrad.blocks.index(block)] = self.GetSquare((row, column))
-
-            if canDrop == True:
-                for i in range(4):
-                    self.ghostTetrad.SetBlockSquare(i, squares[i])
-
-            rowsDown += 1
-
-        self.eventManager.Post(GhostUpdatedEvent(self.ghostTetrad))
-
-
-    def SonicDropCurrentTetrad(self):
-        for i in range(4):
-            self.currentTetrad.SetBlockSquare(i, self.ghostTetrad.GetBlockSquare(i))
-            
-        self.eventManager.Post(SonicDropEvent(self.currentTetrad))
-            
-
-    def DropCurrentTetrad(self):
-        nextSquares = range(4)
-        row, column = (-1, -1)
-        canDrop = True
-
-        #check to see if each block in the tetrad can move down        
-        for i in range(4):
-            row, column = self.currentTetrad.GetBlockCoordinates(i)
-            row += 1
-            if row >= Well.WELL_ROWS:
-                canDrop = False
-                break
-            elif self.GetSquare((row, column)).IsFilled():
-                canDrop = False
-                break
-            else:
-                nextSquares[i] = self.GetSquare((row, column))
-
-        # only move the tetrad if all the target squares are valid        
-        if canDrop == True:
-            for i in range(4):
-                self.currentTetrad.SetBlockSquare(i, nextSquares[i])
-            self.eventManager.Post(TetradDroppedEvent(self.currentTetrad))
-
-        else:
-            self.currentTetrad.SetState(Tetrad.STATE_DROPPED)
-            print "can't drop tetrad"
-
-        return canDrop
-
-    def MoveCurrentTetrad(self, direction):
-        nextSquares = range(4)
-        canMove = True
-        row, column = (-1, -1)
-
-        # make sure the squares the tetrad is moving to are valid and not filled        
-        for i in range(4):
-            row, column = self.currentTetrad.GetBlockCoordinates(i)
-            if direction == DIRECTION_LEFT:
-                column -= 1
-            elif direction == DIRECTION_RIGHT:
-                column += 1
-            elif direction == DIRECTION_DOWN:
-                row += 1
-
-            if row >= Well.WELL_ROWS or column < 0 or column >= Well.WELL_COLUMNS:
-                canMove = False
-                break
-            elif self.GetSquare((row, column)).IsFilled():
-                canMove = False
-                break     
-            else:
-                nextSquares[i] = self.GetSquare((row, column))
-
-        # only move the tetrad if all the target squares are valid        
-        if canMove == True:
-            for i in range(4):
-                self.currentTetrad.SetBlockSquare(i, nextSquares[i])
-            self.currentTetrad.SetState(Tetrad.STATE_ACTIVE)
-            self.eventManager.Post(TetradMovedEvent(self.currentTetrad))
-            
-            if direction != DIRECTION_DOWN:
-                self.UpdateGhostTetrad()
-        else:
-            print "can't move tetrad"
-
-        return canMove            
-
-
-    def RotateCurrentTetrad(self, direction):
-        nextSquares = range(4)
-        canRotate = True
-        row, column = (-1, -1)
-        
-        # make sure the squares the tetrad is rotating to are valid and not filled        
-        for i in range(4):
-            row, column = self.currentTetrad.GetRotatedBlockCoordinates(i, direction) 
-            
-            if row >= Well.WELL_ROWS or column < 0 or column >= Well.WELL_COLUMNS:
-                canRotate = False
-                break
-            elif self.GetSquare((row, column)).IsFilled():
-                canRotate = False
-                break                
-            else:
-                nextSquares[i] = self.GetSquare((row, column))
-
-        # only rotate the tetrad if all the target squares are valid        
-        if canRotate == True:
-            for i in range(4):
-                self.currentTetrad.SetBlockSquare(i, nextSquares[i])
-            self.currentTetrad.ChangeRotationState(direction)
-            self.currentTetrad.SetState(Tetrad.STATE_ACTIVE)
-            self.eventManager.Post(TetradRotatedEvent(self.currentTetrad))
-            
-            self.UpdateGhostTetrad()
-        else:
-            print "can't rotate tetrad"
-
-        return canRotate
-
-
-    def LockCurrentTetrad(self):
-        block = None
-        square = None
-        row, column = (-1, -1)
-        clearedRows = set()
-        clearedBlocks = list()
-        movedBlocks = list()
-        noRowsToShift = 0
-        
-        # add current tetrad to stack, check for cleared rows
-        for block in self.currentTetrad.blocks:
-            row, column = block.GetCoordinates()
-            square = block.GetSquare()
-            square.SetFilled()
-            self.stackedBlocks[row].append(block)
-            if len(self.stackedBlocks[row]) == Well.WELL_COLUMNS:
-                clearedRows.add(row)
-
-        # if any rows were marked for clearance remove them and shift down the other rows
-        if len(clearedRows) > 0:
-            for i in range(max(clearedRows), 0, -1):
-                
-                # remove rows marked for clearance
-                if clearedRows & set([i]):
-                    clearedBlocks.extend(self.stackedBlocks[i])
-                    for block in self.stackedBlocks[i]:
-                        block.GetSquare().SetFilled(False)
-                    self.stackedBlocks[i] = list()
-                    noRowsToShift += 1  
-                
-                # if rows below have been remove shift down the row
-                elif noRowsToShift > 0:
-                    for block in self.stackedBlocks[i]:
-                        square = block.GetSquare()
-                        row, column = square.GetCoordinates()
-                        square.SetFilled(False)
-                        square = self.GetSquare((row + noRowsToShift, column))
-                        square.SetFilled()
-                        block.SetSquare(square)
-                    movedBlocks.extend(self.stackedBlocks[i])
-                    self.stackedBlocks[i + noRowsToShift] = self.stackedBlocks[i]
-                    self.stackedBlocks[i] = list()
-
-            self.eventManager.Post(StackUpdateEvent(clearedBlocks, movedBlocks))
-
-        print "tetrad locked"
-        self.eventManager.Post(TetradLockedEvent(self.currentTetrad))
-
-        return True
-
-    def GetSquare(self, (row, column)):
-        return self.squares[row*Well.WELL_COLUMNS + column]
-
-    def Notify(self, event):
-        if self.currentTetrad != None:
-            
-            if isinstance(event, TetradMoveRequest):
-                if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE or self.currentTetrad.GetState() == Tetrad.STATE_DROPPED:
-                    if self.MoveCurrentTetrad(event.direction) == True:
-                        self.lockTimer = 10 #successful move resets lock timer
-                        
-                # pressing down again locks piece
-                if self.currentTetrad.GetState() == Tetrad.STATE_DROPPED and event.direction == DIRECTION_DOWN:
-                        self.lockTimer = 1 
-                            
-            if isinstance(event, SonicDropRequest):
-                if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE:
-                    self.SonicDropCurrentTetrad()
-
-            elif isinstance(event, TetradRotateRequest):
-                if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE or self.currentTetrad.GetState() == Tetrad.STATE_DROPPED:
-                    if self.RotateCurrentTetrad(event.direction) == True:
-                        self.lockTimer = 10 #successful rotate resets lock timer
-
-            elif isinstance(event, TickEvent):
-                if self.currentTetrad.GetState() == Tetrad.STATE_ACTIVE:
-                    self.dropTimer -= 1
-                    if self.dropTimer == 0:               
-                        self.DropCurrentTetrad()
-                        self.dropTimer = 20
-                        
-                elif self.currentTetrad.GetState() == Tetrad.STATE_DROPPED:
-                    self.lockTimer -= 1
-                    if self.lockTimer == 0:
-                        self.LockCurrentTetrad()
-                        self.lockTimer = 10
-
-
-class Square:
-    """Model for a square of the well that could be filled with a block"""
-    def __init__(self, eventManager, row, column):
-        self.eventManager = eventManager
-        #self.eventManager.RegisterListener(self)
-
-        self.row = row
-        self.column = column
-        self.filled = False
-
-    def GetCoordinates(self):
-        return (self.row, self.column)
-
-    def IsFilled(self):
-        return self.filled
-
-    def SetFilled(self, filled=True):
-        self.filled = filled
-
-
-
-class Block:
-    """Model for the individual blocks that make up tetrads and the pile at the bottom."""
-    
-    def __init__(self, eventManager):
-        self.eventManager = eventManager
-        #self.eventManager.RegisterListener
-
-        #the current square the block occupies
-        self.square = None
-
-
-    def GetCoordinates(self):
-        if self.square == None:
-            print "block has no coordinates"
-            return (-1, -1)
-        return self.square.GetCoordinates()
-
-    def SetSquare(self, square):
-        self.square = square
-
-    def GetSquare(self):
-        return self.square
-
-
-
-
-class Tetrad:
-    """Model for the tetrads that fall from the top into the pile at the bottom."""
-
-    STATE_INACTIVE = 0
-    STATE_ACTIVE = 1
-    STATE_DROPPED = 2
-    STATE_LOCKED = 3
-    
-    def __init__(self, eventManager):
-        self.eventManager = eventManager
-        #self.eventManager.RegisterListener(self)
-
-        # create tetrads blocks
-        self.blocks = range(4)
-        for i in range(0, 4):
-            self.blocks[i] = Block(eventManager)
-
-        self.state = self.STATE_INACTIVE
-        self.rotationState = 0
+    def GetBlockSprite(self, block):
+        return self.blockSprites.get(block)
         
-        self.colour = GREY
-        self.initialBlockCoordinates = [(-1, -1), (-1, -1), (-1, -1), (-1, -1)]
 
-
-    def GetBlock(self, blockIndex):
-        return self.blocks[blockIndex]
-
-    def GetInitialBlockCoordinates(self, blockIndex):
-        return self.initialBlockCoordinates[blockIndex]
-    
-    def GetPreviewBlockCoordinates(self, blockIndex):
-        row, column = self.initialBlockCoordinates[blockIndex]
-        return (row - 2, column - 3)
-    
-    def GetColour(self):
-        return self.colour
-
-
-    def SetState(self, state):
-        self.state = state
+    def Draw(self):
+        """redraw the sprites, returns the dirty rects"""
+        self.backSprites.clear(self.window, self.background)
+        self.frontSprites.clear(self.window, self.background)
         
-    def GetState(self):
-        return self.state
+        self.backSprites.update()
+        self.frontSprites.update()
 
-
-    def ResetRotationState(self):
-        self.rotationState = 0
+        dirtyRects1 = self.backSprites.draw(self.window)
+        dirtyRects2 = self.frontSprites.draw(self.window)
         
-    def ChangeRotationState(self, direction):
-        if direction == DIRECTION_CW:
-            self.rotationState = (self.rotationState + 1) % 4
-        else:
-            self.rotationState = (self.rotationState - 1) % 4
+        return dirtyRects1 + dirtyRects2
+
+    def OnFrame(self, event):
+        if self.diagnostics != None:
+            self.DrawDiagnosedFrame(event)
+            return
+
+        # nothing has moved since the last frame, leave the screen as it is
+        if not self.changed:
+            return
+        self.changed = False
+
+        #Draw everything
+        pygame.display.update( self.Draw() )
+
+    def DrawDiagnosedFrame(self, event):
+        """OnFrame timing the drawing and the display update, with the diagnostics overlay on top"""
+        diagnostics = self.diagnostics
+        renderStart = diagnostics.timer()
+        dirtyRects = []
+        if self.changed:
+            self.changed = False
+            dirtyRects = self.Draw()
+
+        overlayRect = diagnostics.DrawOverlay(self.window, self.background)
+        if overlayRect != None:
+            dirtyRects.append(overlayRect)
+
+        updateStart = diagnostics.timer()
+        if dirtyRects:
+            pygame.display.update(dirtyRects)
+        updateEnd = diagnostics.timer()
+
+        diagnostics.Record(event.noTicks, event.modelTime, updateStart - renderStart, updateEnd - updateStart,
+                           dirtyRects, len(self.frontSprites), len(self.backSprites))
+
+    def OnQuit(self, event):
+        if self.diagnostics != None:
+            self.diagnostics.Close()
+
+    def OnTetradsCreated(self, event):
+        self.changed = True
+        self.AddTetrads(event.tetrads)
+
+    def OnTetradAdded(self, event):
+        self.changed = True
+        self.AddTetrad(event.currentTetrad, event.nextTetrads)
+
+    def OnTetradMoved(self, event):
+        self.changed = True
+        self.MoveTetrad(event.tetrad)
+
+    def OnGhostAdded(self, event):
+        self.changed = True
+        self.AddGhost(event.tetrad)
         
-    def GetRotationState(self):
-        return self.rotationState
-    
-    def SetBlockSquare(self, blockIndex, square):
-        self.blocks[blockIndex].SetSquare(square)
-
-    def GetBlockSquare(self, blockIndex):
-        square = self.blocks[blockIndex].GetSquare()
-        return square
-    
-    def ClearBlocksSquares(self):
-        for block in self.blocks:
-            block.SetSquare(None)
+    def OnGhostUpdated(self, event):
+        self.changed = True
+        self.UpdateGhost(event.tetrad)
 
-    def GetBlockCoordinates(self, blockIndex):
-        return self.blocks[blockIndex].GetCoordinates()
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        return self.GetBlockCoordinates(blockIndex)
-
-    def GetRandomTetrad(eventManager):
-        randNum = random.randint(1,7)
-        tetrad = None
-        if randNum == 1:
-            tetrad = OTetrad(eventManager)
-        elif randNum == 2:
-            tetrad = ITetrad(eventManager)
-        elif randNum == 3:
-            tetrad = TTetrad(eventManager)
-        elif randNum == 4:
-            tetrad = ZTetrad(eventManager)
-        elif randNum == 5:
-            tetrad = STetrad(eventManager)
-        elif randNum == 6:
-            tetrad = LTetrad(eventManager)
-        elif randNum == 7:
-            tetrad = JTetrad(eventManager)
-        return tetrad
-    GetRandomTetrad = Callable(GetRandomTetrad)
-
-
-
-class GhostTetrad(Tetrad):
-    """the ghost or shadow of the current piece"""
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = GREY
-        self.visible = True
-        
-    def SetVisible(self, visible=True):
-        self.visible = visible
-        
-    def IsVisible(self):
-        return self.visible
+    def OnTetradHeld(self, event):
+        self.changed = True
+        self.HoldTetrad(event.tetrad)
         
+    def OnTetradSwapped(self, event):
+        self.changed = True
+        self.GrowTetrad(event.currentTetrad)
+        self.MoveTetrad(event.currentTetrad)
+        self.HoldTetrad(event.holdTetrad)
+
+    def OnStackUpdate(self, event):
+        self.changed = True
+        for block in event.clearedBlocks:
+            self.RemoveBlockSprite(block)
+
+        for block in event.movedBlocks:
+            self.MoveBlock(block)
 
-class OTetrad(Tetrad):
-    """the 'O' shaped tetrad
-            block indices: |0|1|
-                           |3|2|
-            rotates about centre
-    """
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = YELLOW
-        self.initialBlockCoordinates = [(2, 4), (2, 5), (3, 5), (3, 4)]
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        row, column = self.GetBlockCoordinates(blockIndex)
-
-        if direction == DIRECTION_CW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    column += 1
-                elif blockIndex == 1:
-                    row += 1
-                elif blockIndex == 2:
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 1
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    row += 1
-                elif blockIndex == 1:
-                    column -= 1
-                elif blockIndex == 2:
-                    row -= 1
-                elif blockIndex == 3:
-                    column += 1
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    column -= 1
-                elif blockIndex == 1:
-                    row -= 1
-                elif blockIndex == 2:
-                    column += 1
-                elif blockIndex == 3:
-                    row += 1
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    row -= 1
-                elif blockIndex == 1:
-                    column += 1
-                elif blockIndex == 2:
-                    row += 1
-                elif blockIndex == 3:
-                    column -= 1
-        elif direction == DIRECTION_CCW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    row += 1
-                elif blockIndex == 1:
-                    column -= 1
-                elif blockIndex == 2:
-                    row -= 1
-                elif blockIndex == 3:
-                    column += 1
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    column += 1
-                elif blockIndex == 1:
-                    row += 1
-                elif blockIndex == 2:
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 1
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    row -= 1
-                elif blockIndex == 1:
-                    column += 1
-                elif blockIndex == 2:
-                    row += 1
-                elif blockIndex == 3:
-                    column -= 1
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    column -= 1
-                elif blockIndex == 1:
-                    row -= 1
-                elif blockIndex == 2:
-                    column += 1
-                elif blockIndex == 3:
-                    row += 1
-        return (row, column)
-
-
-class ITetrad(Tetrad):
-    """the 'I' shaped tetrad
-            block indices: |0|1|2|3|
-            rotates about block 2
-    """    
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = RED
-        self.initialBlockCoordinates = [(2, 3), (2, 4), (2, 5), (2, 6)]
-
-    def ChangeRotationState(self, direction):
-        if direction == DIRECTION_CW:
-            self.rotationState = (self.rotationState + 1) % 2
-        else:
-            self.rotationState = (self.rotationState - 1) % 2
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        row, column = self.GetBlockCoordinates(blockIndex)
-
-        if self.rotationState == 0:
-            if blockIndex == 0:
-                row -= 2
-                column += 2
-            elif blockIndex == 1:
-                row -= 1
-                column += 1
-            elif blockIndex == 2:
-                pass
-            elif blockIndex == 3:
-                row += 1
-                column -=1
-        elif self.rotationState == 1:
-            if blockIndex == 0:
-                row += 2
-                column -= 2
-            elif blockIndex == 1:
-                row += 1
-                column -= 1
-            elif blockIndex == 2:
-                pass
-            elif blockIndex == 3:
-                row -= 1
-                column += 1
-        return (row, column)
-
-
-class TTetrad(Tetrad):
-    """the 'T' shaped tetrad
-            block indices: |0|1|2|
-                             |3|
-            rotates about block 1
-    """    
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = CYAN
-        self.initialBlockCoordinates = [(2, 3), (2, 4), (2, 5), (3,4)]
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        row, column = self.GetBlockCoordinates(blockIndex)
-
-        if direction == DIRECTION_CW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 1
-                    column -= 1
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    row += 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 1
-                    column += 1
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 1
-                    column += 1
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 1
-                    column -= 1
-        elif direction == DIRECTION_CCW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    row += 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 1
-                    column += 1
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 1
-                    column -= 1
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 1
-                    column -= 1
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 1
-                    column += 1
-        return (row, column)
-
-
-class LTetrad(Tetrad):
-    """the 'L' shaped tetrad
-            block indices: |0|1|2|
-                           |3|
-            rotates about block 1
-    """
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = ORANGE
-        self.initialBlockCoordinates = [(2, 3), (2, 4), (2, 5), (3,3)]
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        row, column = self.GetBlockCoordinates(blockIndex)
-
-        if direction == DIRECTION_CW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 2
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    row += 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 3:
-                    column += 2
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 2
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column += 1
-                elif blockIndex == 3:
-                    column -= 2
-        elif direction == DIRECTION_CCW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    row += 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 3:
-                    column += 2
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 2
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column += 1
-                elif blockIndex == 3:
-                    column -= 2
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 2
-        return (row, column)
-
-
-
-class JTetrad(Tetrad):
-    """the 'J' shaped tetrad
-            block indices: |0|1|2|
-                               |3|
-            rotates about block 1
-    """
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = BLUE
-        self.initialBlockCoordinates = [(2, 3), (2, 4), (2, 5), (3, 5)]
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        row, column = self.GetBlockCoordinates(blockIndex)
-
-        if direction == DIRECTION_CW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 3:
-                    column -= 2
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    row += 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 2
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 3:
-                    column += 2
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 2
-        elif direction == DIRECTION_CCW:
-            if self.rotationState == 0:
-                if blockIndex == 0:
-                    row += 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 3:
-                    row -= 2
-            elif self.rotationState == 3:
-                if blockIndex == 0:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 3:
-                    column -= 2
-            elif self.rotationState == 2:
-                if blockIndex == 0:
-                    row -= 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row += 1
-                    column += 1
-                elif blockIndex == 3:
-                    row += 2
-            elif self.rotationState == 1:
-                if blockIndex == 0:
-                    row += 1
-                    column -= 1
-                elif blockIndex == 1:
-                    pass
-                elif blockIndex == 2:
-                    row -= 1
-                    column += 1
-                elif blockIndex == 3:
-                    column += 2
-        return (row, column)
-
-
-
-class ZTetrad(Tetrad):
-    """the 'Z' shaped tetrad
-            block indices: |0|1|
-                             |2|3|
-            rotates about block 2
-    """
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = GREEN
-        self.initialBlockCoordinates = [(2, 3), (2, 4), (3, 4), (3,5)]
-
-    def ChangeRotationState(self, direction):
-        if direction == DIRECTION_CW:
-            self.rotationState = (self.rotationState + 1) % 2
-        else:
-            self.rotationState = (self.rotationState - 1) % 2
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        row, column = self.GetBlockCoordinates(blockIndex)
-
-        if self.rotationState == 0:
-            if blockIndex == 0:
-                column += 2
-            elif blockIndex == 1:
-                row += 1
-                column += 1
-            elif blockIndex == 2:
-                pass
-            elif blockIndex == 3:
-                row += 1
-                column -=1
-        elif self.rotationState == 1:
-            if blockIndex == 0:
-                column -= 2
-            elif blockIndex == 1:
-                row -= 1
-                column -= 1
-            elif blockIndex == 2:
-                pass
-            elif blockIndex == 3:
-                row -= 1
-                column += 1
-        return (row, column)
-
-
-class STetrad(Tetrad):
-    """the 'S' shaped tetrad
-            block indices:   |0|1|
-                           |2|3|
-            rotates about block 0
-    """
-    def __init__(self, eventManager):
-        Tetrad.__init__(self, eventManager)
-        self.colour = MAGENTA
-        self.initialBlockCoordinates = [(2, 4), (2, 5), (3, 3), (3,4)]
+    def OnGarbageInserted(self, event):
+        self.changed = True
+        for block in event.blocks:
+            self.CreateBlockSprite(block, GREY, self.frontSprites)
+            self.MoveBlock(block)
 
-    def ChangeRotationState(self, direction):
-        if direction == DIRECTION_CW:
-            self.rotationState = (self.rotationState + 1) % 2
-        else:
-            self.rotationState = (self.rotationState - 1) % 2
-
-    def GetRotatedBlockCoordinates(self, blockIndex, direction):
-        row, column = self.GetBlockCoordinates(blockIndex)
-
-        if self.rotationState == 0:
-            if blockIndex == 0:
-                pass
-            elif blockIndex == 1:
-                row -= 1
-                column -= 1
-            elif blockIndex == 2:
-                column += 2
-            elif blockIndex == 3:
-                row -= 1
-                column += 1
-        elif self.rotationState == 1:
-            if blockIndex == 0:
-                pass
-            elif blockIndex == 1:
-                row += 1
-                column += 1
-            elif blockIndex == 2:
-                column -= 2
-            elif blockIndex == 3:
-                row += 1
-                column -= 1
-        return (row, column)
 
 
 def main():
@@ -1486,12 +509,40 @@ def main():
     pygame.init()
 
     eventManager = EventManager()
+    if '--profile' in sys.argv:
+        from profiler import EventProfiler
+        eventManager.SetProfiler(EventProfiler(1.0 / FRAMES_PER_SECOND, dumpInterval=10))
 
     keyboad = KeyboardController(eventManager)
     cpuSpinner = CPUSpinnerController(eventManager)
-    pygameView = PygameView(eventManager)    
 
-    game = Game(eventManager)
+    # auto shift delays are given in milliseconds
+    das, arr = DAS, ARR
+    if '--das' in sys.argv:
+        das = float(sys.argv[sys.argv.index('--das') + 1]) / 1000
+    if '--arr' in sys.argv:
+        arr = float(sys.argv[sys.argv.index('--arr') + 1]) / 1000
+    autoShifter = AutoShifter(eventManager, das, arr)
+
+    # frame timings on screen and logged to the given CSV file
+    diagnostics = None
+    if '--diagnostics' in sys.argv:
+        from diagnostics import FrameDiagnostics
+        diagnostics = FrameDiagnostics(1.0 / FRAMES_PER_SECOND, sys.argv[sys.argv.index('--diagnostics') + 1])
+    pygameView = PygameView(eventManager, diagnostics)
+
+    # recorded games deal tetrads from a seed kept in the replay
+    if '--record' in sys.argv:
+        from replay import ReplayRecorder
+        seed = random.randrange(1 << 31)
+        game = Game(eventManager, GetRandomizer('random', seed))
+        recorder = ReplayRecorder(eventManager, sys.argv[sys.argv.index('--record') + 1], 'random', seed)
+    else:
+        game = Game(eventManager)
+
+    if '--bot' in sys.argv:
+        from bot import HeuristicBot
+        bot = HeuristicBot(eventManager, game.players[0])
 
     cpuSpinner.Run()
 
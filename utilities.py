@@ -1,4 +1,9 @@
-import os, pygame
+import os
+
+try:
+    import pygame
+except ImportError:
+    pygame = None   # the model runs headless without pygame
 
 class Callable:
     """wrapper class to have static methods"""